@@ -0,0 +1,30 @@
+"""draw audit
+
+Revision ID: 7c1d2e9f4a10
+Revises: 2aa19fe3a8fb
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c1d2e9f4a10'
+down_revision: Union[str, Sequence[str], None] = '2aa19fe3a8fb'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('competitions', sa.Column('draw_at', sa.DateTime(), nullable=True))
+    op.add_column('competitions', sa.Column('draw_seed', sa.BigInteger(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('competitions', 'draw_seed')
+    op.drop_column('competitions', 'draw_at')
@@ -0,0 +1,50 @@
+"""competition event log
+
+Revision ID: 9e4b6a2c8d31
+Revises: 7c1d2e9f4a10
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e4b6a2c8d31'
+down_revision: Union[str, Sequence[str], None] = '7c1d2e9f4a10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('competition_events',
+    sa.Column('seq', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), autoincrement=True, nullable=False),
+    sa.Column('competition_id', sa.UUID(), nullable=False),
+    sa.Column('type', sa.String(), nullable=False),
+    sa.Column('payload', sa.JSON(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['competition_id'], ['competitions.id'], ),
+    sa.PrimaryKeyConstraint('seq')
+    )
+    op.create_index(op.f('ix_competition_events_competition_id'), 'competition_events', ['competition_id'], unique=False)
+    op.create_table('competition_snapshots',
+    sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), autoincrement=True, nullable=False),
+    sa.Column('competition_id', sa.UUID(), nullable=False),
+    sa.Column('last_seq', sa.BigInteger(), nullable=False),
+    sa.Column('state', sa.JSON(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['competition_id'], ['competitions.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_competition_snapshots_competition_id'), 'competition_snapshots', ['competition_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_competition_snapshots_competition_id'), table_name='competition_snapshots')
+    op.drop_table('competition_snapshots')
+    op.drop_index(op.f('ix_competition_events_competition_id'), table_name='competition_events')
+    op.drop_table('competition_events')
@@ -0,0 +1,53 @@
+"""hot query indexes
+
+Revision ID: b3f8a1d5c7e2
+Revises: 9e4b6a2c8d31
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3f8a1d5c7e2'
+down_revision: Union[str, Sequence[str], None] = '9e4b6a2c8d31'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+ACTIVE = sa.text("status = 'active'")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_attempts_competition_status_created', 'attempts', ['competition_id', 'status', 'created_at'], unique=False)
+    op.create_index('ix_attempts_active', 'attempts', ['competition_id'], unique=False, postgresql_where=ACTIVE, sqlite_where=ACTIVE)
+    op.create_index('ix_attempts_draw_entry_id', 'attempts', ['draw_entry_id'], unique=False)
+    op.create_index('ix_votes_attempt_role_vote', 'votes', ['attempt_id', 'role', 'vote'], unique=False)
+    op.create_index('ix_competition_roles_competition_user_role', 'competition_roles', ['competition_id', 'user_id', 'role'], unique=False)
+    op.create_index('ix_competition_roles_user_id', 'competition_roles', ['user_id'], unique=False)
+    op.create_index('ix_applications_competition_type_status_federation', 'applications', ['competition_id', 'type', 'status', 'federation_id'], unique=False)
+    op.create_index(op.f('ix_application_athletes_application_id'), 'application_athletes', ['application_id'], unique=False)
+    op.create_index('ix_application_events_application_timestamp', 'application_events', ['application_id', 'timestamp'], unique=False)
+    op.create_index('ix_draw_entries_competition_group_lot', 'competition_draw_entries', ['competition_id', 'gender', 'weight_category', 'group_letter', 'lot_number'], unique=False)
+    with op.batch_alter_table('competition_draw_entries') as batch_op:
+        batch_op.create_unique_constraint('uq_draw_entry_competition_athlete', ['competition_id', 'athlete_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('competition_draw_entries') as batch_op:
+        batch_op.drop_constraint('uq_draw_entry_competition_athlete', type_='unique')
+    op.drop_index('ix_draw_entries_competition_group_lot', table_name='competition_draw_entries')
+    op.drop_index('ix_application_events_application_timestamp', table_name='application_events')
+    op.drop_index(op.f('ix_application_athletes_application_id'), table_name='application_athletes')
+    op.drop_index('ix_applications_competition_type_status_federation', table_name='applications')
+    op.drop_index('ix_competition_roles_user_id', table_name='competition_roles')
+    op.drop_index('ix_competition_roles_competition_user_role', table_name='competition_roles')
+    op.drop_index('ix_votes_attempt_role_vote', table_name='votes')
+    op.drop_index('ix_attempts_draw_entry_id', table_name='attempts')
+    op.drop_index('ix_attempts_active', table_name='attempts')
+    op.drop_index('ix_attempts_competition_status_created', table_name='attempts')
@@ -4,9 +4,68 @@ from pydantic_settings import BaseSettings
 # Для централизованного хранения конфигурации
 class Settings(BaseSettings):
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./dev.db")
+    # Асинхронный движок (asyncpg / aiosqlite) для горячих маршрутов судейства, попыток и результатов
+    ASYNC_DB: bool = os.getenv("ASYNC_DB", "false").lower() in ("1", "true", "yes")
+    ASYNC_DATABASE_URL: str | None = os.getenv("ASYNC_DATABASE_URL")
+
+    # Пул соединений — подбирается под пиковую нагрузку дня соревнований
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", 10))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", 20))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", 30))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", 1800))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+    # SQLite для одной площадки: WAL позволяет читать во время записи
+    SQLITE_JOURNAL_MODE: str = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS: str = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_BUSY_TIMEOUT_MS: int = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000))
+    # Счётчик SQL-запросов на HTTP-запрос (заголовки X-DB-Query-Count / X-DB-Time-ms);
+    # одинаковый запрос QUERY_STATS_REPEAT_WARN раз за запрос — подозрение на N+1.
+    # Отладочный: по умолчанию выключен, включается при разработке и в бенчмарках
+    QUERY_STATS_ENABLED: bool = os.getenv("QUERY_STATS_ENABLED", "false").lower() in ("1", "true", "yes")
+    QUERY_STATS_REPEAT_WARN: int = int(os.getenv("QUERY_STATS_REPEAT_WARN", 5))
+    QUERY_STATS_HISTORY: int = int(os.getenv("QUERY_STATS_HISTORY", 200))
     SECRET_KEY: str = os.getenv("SECRET_KEY", "dev_secret")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 60*24*7))
 
+    # bcrypt: стоимость хэша и отдельный пул потоков под него, чтобы массовый вход
+    # при открытии аккредитации не занимал общий пул и не тормозил судейство.
+    # Изменение BCRYPT_ROUNDS применяется к старым хэшам при следующем входе.
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", 12))
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", min(4, os.cpu_count() or 1)))
+    # сколько ждать свободного слота, прежде чем ответить 503
+    PASSWORD_HASH_WAIT_SECONDS: float = float(os.getenv("PASSWORD_HASH_WAIT_SECONDS", 10))
+
+    # Кэш токен -> пользователь
+    AUTH_CACHE_TTL_SECONDS: float = float(os.getenv("AUTH_CACHE_TTL_SECONDS", 60))
+    AUTH_CACHE_SIZE: int = int(os.getenv("AUTH_CACHE_SIZE", 10000))
+    # Индекс ролей соревнований обновляется через шину; TTL — на случай потерянного сообщения
+    ROLE_INDEX_TTL_SECONDS: float = float(os.getenv("ROLE_INDEX_TTL_SECONDS", 60))
+
+    # Журнал событий: снимок живого состояния каждые N событий;
+    # при загрузке хвост журнала перечитывается с запасом (события идемпотентны)
+    LIVE_SNAPSHOT_EVERY: int = int(os.getenv("LIVE_SNAPSHOT_EVERY", 200))
+    LIVE_SNAPSHOT_OVERLAP: int = int(os.getenv("LIVE_SNAPSHOT_OVERLAP", 500))
+    # Живое состояние перечитывается из таблиц не реже чем раз в TTL — на случай потерянного сообщения шины
+    LIVE_STATE_TTL_SECONDS: float = float(os.getenv("LIVE_STATE_TTL_SECONDS", 60))
+
+    # WebSocket-рассылка: размер очереди на одно подключение и таймаут отправки
+    WS_SEND_QUEUE_SIZE: int = int(os.getenv("WS_SEND_QUEUE_SIZE", 64))
+    WS_SEND_TIMEOUT_SECONDS: float = float(os.getenv("WS_SEND_TIMEOUT_SECONDS", 5.0))
+    # Докачка пропущенных сообщений при переподключении (?last_seq=):
+    # последние N сообщений соревнования в памяти, дальше — из журнала событий,
+    # но не больше WS_REPLAY_LIMIT, иначе клиенту проще перезагрузить состояние
+    WS_REPLAY_BUFFER: int = int(os.getenv("WS_REPLAY_BUFFER", 256))
+    WS_REPLAY_LIMIT: int = int(os.getenv("WS_REPLAY_LIMIT", 1000))
+    # Клиенты с ?batch=true получают сообщения пачками — массивом за одно окно
+    WS_BATCH_WINDOW_MS: int = int(os.getenv("WS_BATCH_WINDOW_MS", 50))
+
+    # Шина рассылки между воркерами: memory (один процесс) / unix (один хост) / postgres (LISTEN/NOTIFY)
+    BROADCAST_BACKEND: str = os.getenv("BROADCAST_BACKEND", "memory")
+    BROADCAST_SOCKET_DIR: str = os.getenv("BROADCAST_SOCKET_DIR", "/tmp/wlt-broadcast")
+    BROADCAST_DATABASE_URL: str | None = os.getenv("BROADCAST_DATABASE_URL")
+    BROADCAST_PG_CHANNEL: str = os.getenv("BROADCAST_PG_CHANNEL", "wlt_broadcast")
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
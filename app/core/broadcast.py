@@ -0,0 +1,271 @@
+import asyncio
+import json
+import logging
+import struct
+import time
+from bisect import insort
+from collections import deque
+from typing import Callable
+
+from fastapi import WebSocket
+
+try:
+    import msgpack
+except ImportError:  # компактная кодировка необязательна
+    msgpack = None
+
+from app.config import settings
+from app.core.bus import BroadcastBus, create_bus
+from app.core.metrics import broadcast_fanout, ws_send_lag
+
+logger = logging.getLogger(__name__)
+
+# Сообщения-состояния: в очереди достаточно держать только последнее такого типа
+COALESCED_TYPES = {"attempt_started", "lift_order"}
+
+ENCODINGS = ("json", "msgpack") if msgpack is not None else ("json",)
+
+
+def _msgpack_array_header(size: int) -> bytes:
+    if size < 16:
+        return bytes([0x90 | size])
+    if size < 2 ** 16:
+        return b"\xdc" + struct.pack(">H", size)
+    return b"\xdd" + struct.pack(">I", size)
+
+
+class OutgoingMessage:
+    """
+    Сообщение для рассылки: кодируется один раз на формат,
+    готовые байты общие для всех сокетов.
+    """
+
+    __slots__ = ("data", "created", "_json", "_msgpack")
+
+    def __init__(self, data: dict):
+        self.data = data
+        self.created = time.perf_counter()
+        self._json: str | None = None
+        self._msgpack: bytes | None = None
+
+    @property
+    def type(self) -> str | None:
+        return self.data.get("type")
+
+    @property
+    def seq(self) -> int | None:
+        return self.data.get("seq")
+
+    def encoded(self, encoding: str) -> str | bytes:
+        if encoding == "msgpack":
+            if self._msgpack is None:
+                self._msgpack = msgpack.packb(self.data)
+            return self._msgpack
+        if self._json is None:
+            # как send_json в Starlette
+            self._json = json.dumps(self.data, separators=(",", ":"), ensure_ascii=False)
+        return self._json
+
+
+def encode_batch(messages: list[OutgoingMessage], encoding: str) -> str | bytes:
+    """Массив из уже закодированных сообщений — без повторной сериализации."""
+    if encoding == "msgpack":
+        return _msgpack_array_header(len(messages)) + b"".join(m.encoded(encoding) for m in messages)
+    return "[" + ",".join(m.encoded(encoding) for m in messages) + "]"
+
+
+class ClientConnection:
+    """
+    Одно WebSocket-подключение со своей ограниченной очередью отправки.
+    Отправкой занимается отдельная задача, поэтому медленный клиент
+    не задерживает остальных.
+    """
+
+    def __init__(self, websocket: WebSocket, queue_size: int, encoding: str = "json", batch: bool = False):
+        self.websocket = websocket
+        self.encoding = encoding if encoding in ENCODINGS else "json"
+        self.batch = batch
+        self.pending: deque[OutgoingMessage] = deque(maxlen=queue_size)
+        self.ready = asyncio.Event()
+        self.dropped = 0
+        self.task: asyncio.Task | None = None
+        self.connected = time.perf_counter()
+
+    def enqueue(self, message: OutgoingMessage | dict) -> None:
+        if not isinstance(message, OutgoingMessage):
+            message = OutgoingMessage(message)
+
+        if message.type in COALESCED_TYPES:
+            for queued in self.pending:
+                if queued.type == message.type:
+                    self.pending.remove(queued)
+                    self.dropped += 1
+                    break
+
+        # deque с maxlen сам выбрасывает самое старое сообщение
+        if len(self.pending) == self.pending.maxlen:
+            self.dropped += 1
+
+        self.pending.append(message)
+        self.ready.set()
+
+    async def send(self, payload: str | bytes, timeout: float) -> None:
+        if isinstance(payload, bytes):
+            await asyncio.wait_for(self.websocket.send_bytes(payload), timeout)
+        else:
+            await asyncio.wait_for(self.websocket.send_text(payload), timeout)
+
+    async def send_loop(self, timeout: float, batch_window: float = 0) -> None:
+        while True:
+            if not self.pending:
+                self.ready.clear()
+                await self.ready.wait()
+                continue
+
+            if not self.batch:
+                message = self.pending.popleft()
+                await self.send(message.encoded(self.encoding), timeout)
+                self._observe_lag(message)
+                continue
+
+            # голоса судей приходят почти одновременно — копим окно и шлём одним кадром
+            if batch_window:
+                await asyncio.sleep(batch_window)
+            messages = list(self.pending)
+            self.pending.clear()
+            await self.send(encode_batch(messages, self.encoding), timeout)
+            self._observe_lag(messages[0])
+
+    def _observe_lag(self, message: OutgoingMessage) -> None:
+        # докачка при подключении — старые сообщения, их задержка не показательна
+        if message.created >= self.connected:
+            ws_send_lag.observe_since(message.created)
+
+
+class ConnectionManager:
+    def __init__(
+        self,
+        bus: BroadcastBus | None = None,
+        queue_size: int = settings.WS_SEND_QUEUE_SIZE,
+        send_timeout: float = settings.WS_SEND_TIMEOUT_SECONDS,
+        history_size: int = settings.WS_REPLAY_BUFFER,
+        batch_window_ms: int = settings.WS_BATCH_WINDOW_MS,
+    ):
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+        self.history_size = history_size
+        self.batch_window = batch_window_ms / 1000
+        # последние сообщения с seq по каждому соревнованию — для докачки
+        self.history: dict[str, list[tuple[int, OutgoingMessage]]] = {}
+        self.active_connections: dict[str, dict[WebSocket, ClientConnection]] = {}
+        # служебные каналы шины (сброс кэшей и т.п.) — не уходят в сокеты
+        self.listeners: dict[str, list[Callable[[dict], None]]] = {}
+
+        self.bus = bus or create_bus()
+        self.bus.subscribe(self._deliver)
+
+    async def start(self):
+        await self.bus.start()
+
+    async def stop(self):
+        await self.bus.stop()
+
+    async def connect(
+        self,
+        competition_id: str,
+        websocket: WebSocket,
+        backlog: list[OutgoingMessage | dict] = (),
+        last_seq: int | None = None,
+        encoding: str = "json",
+        batch: bool = False,
+    ):
+        """
+        backlog — пропущенные сообщения, собранные до подключения;
+        то, что пришло в буфер уже после last_seq, добавляется здесь же,
+        до регистрации клиента — без дублей и в порядке seq.
+        """
+        await websocket.accept()
+
+        client = ClientConnection(websocket, max(self.queue_size, len(backlog) + 1), encoding, batch)
+        for message in backlog:
+            client.enqueue(message)
+        if last_seq is not None:
+            # всё из буфера новее backlog — в том числе пришедшее во время accept
+            # или запроса к журналу. replay() здесь не годится: на свежем воркере
+            # буфер «не покрывает» промежуток и вернул бы None
+            last_seq = max([last_seq] + [m.seq for m in client.pending if m.seq is not None])
+            for seq, message in self.history.get(competition_id, ()):
+                if seq > last_seq:
+                    client.enqueue(message)
+
+        client.task = asyncio.create_task(self._run_client(competition_id, client))
+        self.active_connections.setdefault(competition_id, {})[websocket] = client
+
+    def disconnect(self, competition_id: str, websocket: WebSocket):
+        connections = self.active_connections.get(competition_id)
+        if not connections:
+            return
+
+        client = connections.pop(websocket, None)
+        if not connections:
+            self.active_connections.pop(competition_id, None)
+
+        if client and client.task and client.task is not asyncio.current_task():
+            client.task.cancel()
+
+    def add_listener(self, channel: str, callback: Callable[[dict], None]):
+        self.listeners.setdefault(channel, []).append(callback)
+
+    async def broadcast(self, competition_id: str, message: dict):
+        # Через шину сообщение дойдёт до сокетов всех воркеров, включая этот
+        await self.bus.publish(competition_id, message)
+
+    def replay(self, competition_id: str, last_seq: int) -> list[OutgoingMessage] | None:
+        """Сообщения после last_seq. None — буфер не покрывает этот промежуток."""
+        history = self.history.get(competition_id)
+        if not history or history[0][0] > last_seq:
+            return None
+        return [message for seq, message in history if seq > last_seq]
+
+    def _remember(self, competition_id: str, message: OutgoingMessage) -> None:
+        history = self.history.setdefault(competition_id, [])
+        # от разных воркеров сообщения могут прийти не по порядку
+        insort(history, (message.seq, message), key=lambda item: item[0])
+        if len(history) > self.history_size:
+            del history[: len(history) - self.history_size]
+
+    async def _deliver(self, competition_id: str, message: dict):
+        started = time.perf_counter()
+        for callback in self.listeners.get(competition_id, ()):
+            callback(message)
+
+        connections = self.active_connections.get(competition_id)
+        if "seq" not in message and not connections:
+            return
+
+        # кодируется один раз — при первой отправке в каждом формате
+        outgoing = OutgoingMessage(message)
+        if outgoing.seq is not None:
+            self._remember(competition_id, outgoing)
+
+        # Только раскладываем по очередям — сама отправка идёт параллельно
+        for client in list((connections or {}).values()):
+            client.enqueue(outgoing)
+        broadcast_fanout.observe_since(started)
+
+    async def _run_client(self, competition_id: str, client: ClientConnection):
+        try:
+            await client.send_loop(self.send_timeout, self.batch_window)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            # Мёртвый или зависший сокет — убираем, чтобы не копить для него очередь
+            logger.info("Evicting websocket for competition %s: %r", competition_id, exc)
+            self.disconnect(competition_id, client.websocket)
+            try:
+                await client.websocket.close()
+            except Exception:
+                pass
+
+
+manager = ConnectionManager()
@@ -0,0 +1,211 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import uuid
+from pathlib import Path
+from typing import Awaitable, Callable
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[str, dict], Awaitable[None]]
+
+
+class PayloadTooLarge(ValueError):
+    pass
+
+
+class BroadcastBus:
+    """
+    Шина рассылки между процессами.
+    publish() отправляет сообщение всем воркерам (включая текущий),
+    каждый воркер получает его через handler и раздаёт своим сокетам.
+    max_payload — предел размера одного сообщения в байтах (None — без предела).
+    """
+
+    max_payload: int | None = None
+
+    def __init__(self):
+        self.handler: Handler | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    def subscribe(self, handler: Handler) -> None:
+        self.handler = handler
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    async def publish(self, channel: str, message: dict) -> None:
+        raise NotImplementedError
+
+    async def _dispatch(self, channel: str, message: dict) -> None:
+        if self.handler:
+            await self.handler(channel, message)
+
+    def _encode(self, channel: str, message: dict) -> bytes:
+        data = json.dumps({"channel": channel, "message": message}).encode()
+        # иначе сообщение молча обрежется или будет отвергнуто на другом конце
+        if self.max_payload is not None and len(data) > self.max_payload:
+            raise PayloadTooLarge(
+                f"Broadcast message on channel {channel!r} is {len(data)} bytes, limit {self.max_payload}"
+            )
+        return data
+
+    def _dispatch_soon(self, channel: str, message: dict) -> None:
+        # вызывается из колбэков add_reader — держим ссылку, чтобы задачу не собрал GC
+        task = asyncio.create_task(self._dispatch(channel, message))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+
+class InProcessBus(BroadcastBus):
+    """Один процесс — сообщение сразу уходит обработчику."""
+
+    async def publish(self, channel: str, message: dict) -> None:
+        await self._dispatch(channel, message)
+
+
+class UnixSocketBus(BroadcastBus):
+    """
+    Воркеры одного хоста: каждый процесс слушает свой датаграммный
+    unix-сокет в общей директории, publish рассылает датаграмму всем соседям.
+    Внешние сервисы не нужны.
+    """
+
+    # столько читает recv — длинная датаграмма обрезалась бы
+    max_payload = 65536
+
+    def __init__(self, directory: str):
+        super().__init__()
+        self.directory = Path(directory)
+        self.path = self.directory / f"{os.getpid()}-{uuid.uuid4().hex[:8]}.sock"
+        self.sock: socket.socket | None = None
+
+    async def start(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+        self.sock.bind(str(self.path))
+        asyncio.get_running_loop().add_reader(self.sock.fileno(), self._on_readable)
+
+    async def stop(self) -> None:
+        if self.sock is None:
+            return
+        asyncio.get_running_loop().remove_reader(self.sock.fileno())
+        self.sock.close()
+        self.sock = None
+        self.path.unlink(missing_ok=True)
+
+    async def publish(self, channel: str, message: dict) -> None:
+        data = self._encode(channel, message)
+
+        if self.sock is not None:
+            for peer in self.directory.glob("*.sock"):
+                if peer == self.path:
+                    continue
+                try:
+                    self.sock.sendto(data, str(peer))
+                except (ConnectionRefusedError, FileNotFoundError):
+                    # процесс умер, а сокет остался — убираем
+                    peer.unlink(missing_ok=True)
+                except BlockingIOError:
+                    logger.warning("Broadcast peer %s is not reading, message dropped", peer)
+
+        await self._dispatch(channel, message)
+
+    def _on_readable(self) -> None:
+        while True:
+            try:
+                data = self.sock.recv(self.max_payload)
+            except (BlockingIOError, OSError):
+                return
+            try:
+                packet = json.loads(data)
+            except ValueError:
+                logger.warning("Malformed broadcast datagram ignored")
+                continue
+            self._dispatch_soon(packet["channel"], packet["message"])
+
+
+class PostgresNotifyBus(BroadcastBus):
+    """
+    Несколько хостов с общей Postgres: LISTEN/NOTIFY.
+    Текущий процесс тоже слушает канал, поэтому сообщения
+    доставляются всем в одном и том же порядке.
+    """
+
+    # payload NOTIFY должен быть короче 8000 байт
+    max_payload = 7999
+
+    def __init__(self, dsn: str, channel: str):
+        super().__init__()
+        self.dsn = dsn
+        self.channel = channel
+        self.listen_conn = None
+        self.notify_conn = None
+
+    def _connect(self):
+        import psycopg2
+
+        conn = psycopg2.connect(self.dsn)
+        conn.autocommit = True
+        return conn
+
+    async def start(self) -> None:
+        self.listen_conn = self._connect()
+        self.notify_conn = self._connect()
+        with self.listen_conn.cursor() as cur:
+            cur.execute(f'LISTEN "{self.channel}"')
+        asyncio.get_running_loop().add_reader(self.listen_conn.fileno(), self._on_readable)
+
+    async def stop(self) -> None:
+        if self.listen_conn is not None:
+            asyncio.get_running_loop().remove_reader(self.listen_conn.fileno())
+            self.listen_conn.close()
+            self.listen_conn = None
+        if self.notify_conn is not None:
+            self.notify_conn.close()
+            self.notify_conn = None
+
+    async def publish(self, channel: str, message: dict) -> None:
+        payload = self._encode(channel, message).decode()
+        if self.notify_conn is None:
+            # шина ещё не запущена (например, скрипт без startup) — доставляем локально
+            await self._dispatch(channel, message)
+            return
+
+        await asyncio.get_running_loop().run_in_executor(None, self._notify, payload)
+
+    def _notify(self, payload: str) -> None:
+        with self.notify_conn.cursor() as cur:
+            cur.execute("SELECT pg_notify(%s, %s)", (self.channel, payload))
+
+    def _on_readable(self) -> None:
+        self.listen_conn.poll()
+        while self.listen_conn.notifies:
+            notify = self.listen_conn.notifies.pop(0)
+            packet = json.loads(notify.payload)
+            self._dispatch_soon(packet["channel"], packet["message"])
+
+
+def create_bus() -> BroadcastBus:
+    backend = settings.BROADCAST_BACKEND
+
+    if backend == "memory":
+        return InProcessBus()
+    if backend == "unix":
+        return UnixSocketBus(settings.BROADCAST_SOCKET_DIR)
+    if backend == "postgres":
+        from sqlalchemy.engine import make_url
+
+        url = make_url(settings.BROADCAST_DATABASE_URL or settings.DATABASE_URL)
+        dsn = url.set(drivername="postgresql").render_as_string(hide_password=False)
+        return PostgresNotifyBus(dsn, settings.BROADCAST_PG_CHANNEL)
+
+    raise ValueError(f"Unknown BROADCAST_BACKEND: {backend}")
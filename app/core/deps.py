@@ -3,11 +3,48 @@ from uuid import UUID
 from fastapi import Depends, HTTPException, status
 from starlette.requests import Request
 
+from app.core.roles import role_index
 from app.core.security import get_current_user
 from app import models
-from sqlalchemy.orm import Session
-from app.database import get_db
-from app.models import CompetitionRole, User, ApplicationStatus
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import async_session, get_async_db
+from app.models import User, ApplicationStatus
+
+
+class CompetitionAccess:
+    """
+    Права текущего пользователя в соревнованиях — через индекс ролей,
+    без отдельного запроса к competition_roles на каждую проверку.
+
+    db — сессия самого маршрута (async-маршруты). Без неё роли при промахе
+    индекса грузятся в короткой сессии: синхронные маршруты держат свою
+    get_db, и вторая сессия на весь запрос заняла бы второе соединение пула.
+    """
+
+    def __init__(self, user: User, db: AsyncSession | None = None):
+        self.user = user
+        self.db = db
+
+    async def roles(self, competition_id) -> set[str]:
+        if self.db is not None:
+            return await role_index.roles(self.db, competition_id, self.user.id)
+        async with async_session() as db:
+            return await role_index.roles(db, competition_id, self.user.id)
+
+    async def has_any(self, competition_id, roles) -> bool:
+        return bool(await self.roles(competition_id) & set(roles))
+
+    async def require(self, competition_id, *roles: str) -> User:
+        if not await self.has_any(competition_id, roles):
+            raise HTTPException(status_code=403, detail="Недостаточно прав")
+        return self.user
+
+
+async def get_competition_access(
+    db: AsyncSession = Depends(get_async_db),
+    user: User = Depends(get_current_user),
+) -> CompetitionAccess:
+    return CompetitionAccess(user, db)
 
 
 def require_global_role(required_roles: list[str]):
@@ -30,21 +67,18 @@ def require_superadmin_or_own_competition(required_roles: list[str]):
     - если пользователь super_admin (ко всем соревнованиям)
     - если organizer И он назначен в это соревнование
     """
-    def role_checker(
+    async def role_checker(
         competition_id: str,
-        db: Session = Depends(get_db),
-        user: models.user.User = Depends(get_current_user)
+        user: User = Depends(get_current_user),
     ):
+        access = CompetitionAccess(user)
+
         # супер-админ имеет полный доступ
         if user.global_role == "super_admin":
             return user
 
         # проверяем, что пользователь organizer именно этого соревнования
-        role = db.query(models.competition_role.CompetitionRole).filter_by(
-            user_id=user.id, competition_id=competition_id, role="organizer"
-        ).first()
-
-        if not role:
+        if not await access.has_any(competition_id, ("organizer",)):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Недостаточно прав (не organizer этого соревнования)"
@@ -54,28 +88,17 @@ def require_superadmin_or_own_competition(required_roles: list[str]):
 
 
 def require_competition_role(allowed_roles: tuple[str, ...]):
-    def dependency(
+    async def dependency(
         request: Request,
-        db = Depends(get_db),
-        user = Depends(get_current_user),
+        user: User = Depends(get_current_user),
     ):
+        access = CompetitionAccess(user)
         competition_id = request.path_params.get("competition_id")
 
         if not competition_id:
             raise HTTPException(400, "competition_id not found in path")
-        role = (
-            db.query(CompetitionRole)
-            .filter_by(
-                competition_id=competition_id,
-                user_id=user.id,
-            )
-            .first()
-        )
-
-        if not role or role.role not in allowed_roles:
-            raise HTTPException(status_code=403, detail="Недостаточно прав")
 
-        return user
+        return await access.require(competition_id, *allowed_roles)
 
     return dependency
 
@@ -0,0 +1,148 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Iterable
+
+# Границы корзин по умолчанию (секунды): от быстрых чтений из кэша до медленных отчётов
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Iterable[str], values: Iterable) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Гистограмма в формате Prometheus: накопительные корзины, сумма и количество."""
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        # значения меток -> [счётчики по корзинам (+Inf последней), сумма]
+        self._series: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def observe_since(self, started: float, *labels) -> None:
+        self.observe(time.perf_counter() - started, *labels)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+
+        names = self.labelnames + ("le",)
+        for labels, counts, total in sorted(series):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(names, labels + (_number(bound),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """Текущее значение (запросы в работе и т.п.)."""
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        self.inc(-amount)
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge", f"{self.name} {_number(self.value)}"]
+
+
+def sample_lines(name: str, help: str, kind: str, labelnames: tuple[str, ...], samples: dict[tuple, float]) -> list[str]:
+    """Метрика, значения которой собираются в момент запроса /metrics."""
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+    lines.extend(f"{name}{_labels(labelnames, labels)} {_number(value)}" for labels, value in sorted(samples.items()))
+    return lines
+
+
+def route_template(scope: dict) -> str:
+    """
+    Полный шаблон маршрута для метки: /competitions/{competition_id}/results.
+    route.path у маршрутов из include_router(prefix=...) — без префикса,
+    поэтому шаблон строится из фактического пути: сегменты со значениями
+    параметров заменяются на {имя}. Несопоставленные пути — одна метка.
+    """
+    if scope.get("route") is None:
+        return "unmatched"
+
+    names = {str(value): name for name, value in scope.get("path_params", {}).items()}
+    return "/".join(
+        f"{{{names[segment]}}}" if segment in names else segment
+        for segment in scope["path"].split("/")
+    )
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: list[Histogram | Gauge] = []
+        # функции, которые при каждом /metrics читают текущее состояние (пулы, сокеты)
+        self.collectors: list[Callable[[], list[str]]] = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], list[str]]) -> None:
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        for collector in self.collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_request_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ("method", "route", "status"),
+))
+http_requests_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being processed",
+))
+broadcast_fanout = registry.register(Histogram(
+    "broadcast_fanout_seconds", "Time to hand one bus message to listeners and all socket queues",
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25),
+))
+ws_send_lag = registry.register(Histogram(
+    "ws_send_lag_seconds", "Time from fan-out to the frame being written to a socket",
+))
+vote_to_close = registry.register(Histogram(
+    "vote_to_close_seconds", "Time from the deciding vote request to the attempt_closed broadcast",
+))
@@ -0,0 +1,56 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+from app.config import settings
+
+# Хэши с другой стоимостью помечаются устаревшими — verify_and_update вернёт новый
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
+
+
+class PasswordHasher:
+    """
+    bcrypt в собственном пуле потоков (bcrypt отпускает GIL, так что потоки
+    считают параллельно). Семафор держит не больше workers хэшей одновременно:
+    остальные ждут в event loop, не занимая ни потоков, ни общего пула
+    run_in_threadpool, через который работают синхронные маршруты.
+    """
+
+    def __init__(self, workers: int = settings.PASSWORD_HASH_WORKERS, wait_seconds: float = settings.PASSWORD_HASH_WAIT_SECONDS):
+        self.workers = max(workers, 1)
+        self.wait_seconds = wait_seconds
+        self._executor: ThreadPoolExecutor | None = None
+        self._slots = asyncio.Semaphore(self.workers)
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    async def _run(self, fn, *args):
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.wait_seconds)
+        except asyncio.TimeoutError:
+            raise HTTPException(503, "Сервер перегружен, повторите вход позже", headers={"Retry-After": "5"})
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+        finally:
+            self._slots.release()
+
+    async def hash(self, password: str) -> str:
+        return await self._run(pwd_context.hash, password)
+
+    async def verify(self, password: str, hashed: str) -> tuple[bool, str | None]:
+        """(пароль верный, новый хэш или None — если стоимость не менялась)."""
+        return await self._run(pwd_context.verify_and_update, password, hashed)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+hasher = PasswordHasher()
@@ -0,0 +1,136 @@
+import logging
+import re
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+# IN (?, ?, ?) / IN ($1, $2) с разным числом параметров — один и тот же запрос
+_PARAM_LIST = re.compile(r"\(\s*(\?|%\(\w+\)s|\$\d+|:\w+)(\s*,\s*(\?|%\(\w+\)s|\$\d+|:\w+))*\s*\)")
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+
+def fingerprint(statement: str) -> str:
+    """SQL без литералов и длины IN-списков: повторы одного запроса схлопываются."""
+    statement = _WHITESPACE.sub(" ", statement).strip()
+    statement = _LITERAL.sub("?", statement)
+    return _PARAM_LIST.sub("(?)", statement)
+
+
+@dataclass
+class QueryStats:
+    """Запросы к БД в рамках одного HTTP-запроса (или блока assert_max_queries)."""
+
+    count: int = 0
+    seconds: float = 0.0
+    statements: Counter = field(default_factory=Counter)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, statement: str, seconds: float) -> None:
+        # синхронные маршруты выполняют запросы в пуле потоков
+        with self._lock:
+            self.count += 1
+            self.seconds += seconds
+            self.statements[fingerprint(statement)] += 1
+
+    def repeated(self, threshold: int = 2) -> list[tuple[str, int]]:
+        return [(sql, n) for sql, n in self.statements.most_common() if n >= threshold]
+
+    def report(self, threshold: int = 2) -> dict:
+        return {
+            "queries": self.count,
+            "db_time_ms": round(self.seconds * 1000, 3),
+            "repeated": [{"statement": sql, "count": n} for sql, n in self.repeated(threshold)],
+        }
+
+
+# Статистика текущего HTTP-запроса; копия контекста доходит и до пула потоков
+_current: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+# Блоки assert_max_queries: считают все запросы процесса, а не только своего контекста —
+# TestClient и ASGITransport выполняют приложение в другой задаче
+_watchers: list[QueryStats] = []
+
+# Последние запросы с подозрением на N+1 — для /monitoring/queries
+recent: deque[dict] = deque(maxlen=settings.QUERY_STATS_HISTORY)
+
+
+def current() -> QueryStats | None:
+    return _current.get()
+
+
+def begin() -> tuple[QueryStats, object]:
+    stats = QueryStats()
+    return stats, _current.set(stats)
+
+
+def end(token) -> None:
+    _current.reset(token)
+
+
+def finish(method: str, path: str, stats: QueryStats) -> None:
+    """Подозрение на N+1 — в лог и в историю для отладочного маршрута."""
+    repeated = stats.repeated(settings.QUERY_STATS_REPEAT_WARN)
+    if not repeated:
+        return
+    statement, times = repeated[0]
+    logger.warning(
+        "%s %s: %d queries, statement repeated %d times (possible N+1): %s",
+        method, path, stats.count, times, statement[:200],
+    )
+    recent.append({"method": method, "path": path, **stats.report(settings.QUERY_STATS_REPEAT_WARN)})
+
+
+def install(engine) -> None:
+    """Подписывает движок (для async — его sync_engine) на учёт запросов."""
+
+    # время старта — в контексте выполнения самого запроса: если запрос упал
+    # (например, IntegrityError на повторном голосе), after_cursor_execute
+    # не вызывается и на соединении из пула ничего не остаётся
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._query_stats_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_query_stats_started", None)
+        if started is None:
+            return
+        seconds = time.perf_counter() - started
+        stats = _current.get()
+        if stats is not None:
+            stats.record(statement, seconds)
+        for watcher in _watchers:
+            watcher.record(statement, seconds)
+
+
+@contextmanager
+def assert_max_queries(limit: int):
+    """
+    Бюджет запросов для проверок и бенчмарков:
+
+        with assert_max_queries(3):
+            client.get(f"/competitions/{cid}/applications")
+
+    Превышение — AssertionError со списком повторяющихся запросов.
+    """
+    stats = QueryStats()
+    _watchers.append(stats)
+    try:
+        yield stats
+    finally:
+        _watchers.remove(stats)
+
+    if stats.count > limit:
+        lines = [f"{n} x {sql}" for sql, n in stats.statements.most_common()]
+        raise AssertionError(f"{stats.count} queries, budget {limit}:\n" + "\n".join(lines))
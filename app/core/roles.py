@@ -0,0 +1,121 @@
+import time
+from uuid import UUID
+
+from fastapi import BackgroundTasks
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.core.broadcast import manager
+from app.core.versioning import versions
+from app.models import CompetitionRole
+
+# Служебный канал шины: роли соревнования изменились
+ROLES_CHANNEL = "competition_roles"
+
+
+def _key(value: UUID | str) -> str:
+    # id из пути может прийти в любом написании — приводим к каноническому
+    return str(UUID(str(value)))
+
+
+class RoleIndex:
+    """
+    Индекс ролей (competition_id, user_id) -> {роли}.
+    Роли соревнования загружаются одним запросом при первом обращении,
+    дальше проверка прав — обращение к словарю.
+
+    Поколение соревнования растёт при каждом изменении ролей, даже если
+    соревнование ещё не загружено: загрузка, во время которой роли
+    поменялись, могла прочитать старые данные и в индекс не попадает.
+    TTL — страховка от потерянных сообщений шины.
+    """
+
+    # сколько раз перечитывать, если роли меняются прямо во время загрузки
+    LOAD_ATTEMPTS = 3
+
+    def __init__(self, ttl: float = settings.ROLE_INDEX_TTL_SECONDS):
+        self.ttl = ttl
+        self.competitions: dict[str, dict[str, set[str]]] = {}
+        self.loaded_at: dict[str, float] = {}
+        self.generations: dict[str, int] = {}
+
+    async def _competition(self, db: AsyncSession, competition_id: str) -> dict[str, set[str]]:
+        users = self.competitions.get(competition_id)
+        if users is not None and time.monotonic() - self.loaded_at.get(competition_id, 0) < self.ttl:
+            return users
+
+        for _ in range(self.LOAD_ATTEMPTS):
+            generation = self.generations.get(competition_id, 0)
+            users = {}
+            rows = await db.execute(
+                select(CompetitionRole.user_id, CompetitionRole.role)
+                .where(CompetitionRole.competition_id == UUID(competition_id))
+            )
+            for user_id, role in rows:
+                users.setdefault(str(user_id), set()).add(role)
+
+            if self.generations.get(competition_id, 0) == generation:
+                self.competitions[competition_id] = users
+                self.loaded_at[competition_id] = time.monotonic()
+                return users
+
+        # роли всё время меняются — отвечаем по последнему чтению, но не кэшируем
+        return users
+
+    async def roles(self, db: AsyncSession, competition_id: UUID | str, user_id: UUID | str) -> set[str]:
+        try:
+            competition_id, user_id = _key(competition_id), _key(user_id)
+        except ValueError:
+            return set()
+        return (await self._competition(db, competition_id)).get(user_id, set())
+
+    async def count(self, db: AsyncSession, competition_id: UUID | str, role: str) -> int:
+        users = await self._competition(db, _key(competition_id))
+        return sum(1 for roles in users.values() if role in roles)
+
+    def apply(self, message: dict) -> None:
+        competition_id = message["competition_id"]
+        self.generations[competition_id] = self.generations.get(competition_id, 0) + 1
+
+        users = self.competitions.get(competition_id)
+        if users is None:
+            return
+
+        if message["action"] == "assigned":
+            users.setdefault(message["user_id"], set()).add(message["role"])
+        else:
+            # у пользователя может быть несколько одинаковых записей — перечитаем из БД
+            self.competitions.pop(competition_id, None)
+
+
+role_index = RoleIndex()
+
+
+async def get_judges_count(db: AsyncSession, competition_id: UUID | str) -> int:
+    return await role_index.count(db, competition_id, "judge")
+
+
+def roles_changed(
+    competition_id: UUID | str,
+    user_id: UUID | str,
+    role: str,
+    action: str,
+    background_tasks: BackgroundTasks,
+) -> None:
+    """
+    Вызывается после commit (action: assigned / removed):
+    обновляем индекс здесь и (через шину) в остальных воркерах.
+    """
+    message = {
+        "competition_id": _key(competition_id),
+        "user_id": _key(user_id),
+        "role": getattr(role, "value", role),
+        "action": action,
+    }
+    role_index.apply(message)
+    background_tasks.add_task(manager.broadcast, ROLES_CHANNEL, message)
+    versions.bump(message["competition_id"], background_tasks=background_tasks)
+
+
+manager.add_listener(ROLES_CHANNEL, role_index.apply)
@@ -1,4 +1,5 @@
 # Импортируем стандартные библиотеки для работы с датой и временем, UUID
+import time
 from datetime import datetime, timedelta
 from typing import Optional
 from uuid import UUID
@@ -10,12 +11,10 @@ from jose import jwt, JWTError
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
-# SQLAlchemy сессия
-from sqlalchemy.orm import Session
-
 # Конфигурация проекта (секретный ключ, время жизни токена)
 from app.config import settings
-from app.database import get_db
+from app.core.cache import TTLCache
+from app.database import async_session
 from app.models.user import User
 
 # Настраиваем схему безопасности HTTP Bearer (токен передается в заголовке Authorization)
@@ -31,12 +30,34 @@ def create_access_token(data: dict, expires_minutes: Optional[int] = None) -> st
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)     # Возвращаем закодированный JWT-токен
 
+# Кэш токен -> пользователь: судьи голосуют сотни раз за сессию,
+# и каждый запрос не должен ходить в БД за пользователем.
+# Роли в соревнованиях — в индексе app.core.roles.role_index
+user_cache = TTLCache(settings.AUTH_CACHE_SIZE, settings.AUTH_CACHE_TTL_SECONDS)
+
+
+def load_user(session, user_id: UUID) -> User | None:
+    """
+    Пользователь по id; транзакция закрывается сразу (как auth.find_user).
+    Объект живёт дольше сессии — он уходит в кэш токенов.
+    """
+    user = session.get(User, user_id)
+    if user is not None:
+        session.expunge(user)
+    session.commit()
+    return user
+
+
 # Функция получения текущего пользователя из токена
-def get_current_user(
+async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security_scheme),
-    db: Session = Depends(get_db),
 ) -> User:
     token = credentials.credentials
+
+    user = user_cache.get(token)
+    if user is not None:
+        return user
+
     # Настраиваем стандартное исключение для недействительного токе
     cred_exc = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -53,8 +74,13 @@ def get_current_user(
     except (JWTError, ValueError):
         raise cred_exc
 
-    # Получаем пользователя из базы по его UUID
-    user = db.get(User, user_id)
+    # Получаем пользователя из базы по его UUID — в своей короткой сессии:
+    # соединение возвращается в пул до того, как маршрут возьмёт своё (get_db)
+    async with async_session() as db:
+        user = await db.run_sync(load_user, user_id)
     if not user:
         raise cred_exc
+
+    # запись не переживает сам токен
+    user_cache.set(token, user, ttl=payload.get("exp", 0) - time.time())
     return user
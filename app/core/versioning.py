@@ -0,0 +1,85 @@
+import threading
+from uuid import UUID, uuid4
+
+from fastapi import BackgroundTasks, HTTPException, Request, Response
+
+from app.core.broadcast import manager
+
+# Служебный канал шины: данные соревнования изменились
+VERSIONS_CHANNEL = "versions"
+
+# Ключ списка соревнований (GET /competitions/)
+COMPETITIONS_KEY = "competitions"
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+class VersionRegistry:
+    """
+    Версии данных по ключу (id соревнования или COMPETITIONS_KEY).
+    Каждая запись после commit увеличивает версию здесь и, через шину,
+    в остальных воркерах. Счётчики у каждого процесса свои, поэтому
+    в ETag входит epoch процесса: после перезапуска или на другом воркере
+    старый ETag просто не совпадёт.
+    """
+
+    def __init__(self):
+        self.epoch = uuid4().hex[:12]
+        self.versions: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def current(self, key: str) -> int:
+        return self.versions.get(key, 0)
+
+    def etag(self, key: str) -> str:
+        return f'W/"{self.epoch}-{self.current(key)}"'
+
+    def bump_local(self, *keys: str) -> None:
+        with self._lock:
+            for key in keys:
+                self.versions[key] = self.versions.get(key, 0) + 1
+
+    def apply(self, message: dict) -> None:
+        # свои изменения уже учтены в bump
+        if message["epoch"] != self.epoch:
+            self.bump_local(*message["keys"])
+
+    def bump(self, *keys: UUID | str, background_tasks: BackgroundTasks) -> None:
+        """Вызывается после commit."""
+        keys = [str(key) for key in keys]
+        self.bump_local(*keys)
+        background_tasks.add_task(manager.broadcast, VERSIONS_CHANNEL, {"epoch": self.epoch, "keys": keys})
+
+
+versions = VersionRegistry()
+
+manager.add_listener(VERSIONS_CHANNEL, versions.apply)
+
+
+def conditional_get(request: Request, response: Response, key: str) -> None:
+    """
+    ETag ответа — версия данных на момент начала запроса (до чтения из БД).
+    Совпал If-None-Match — отвечаем 304 без запроса к БД.
+    """
+    etag = versions.etag(key)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        raise HTTPException(304, headers=headers)
+    response.headers.update(headers)
+
+
+def competition_etag(competition_id: UUID, request: Request, response: Response) -> None:
+    """
+    Маршрутам с проверкой прав — параметром после зависимостей авторизации,
+    не в dependencies=[...] декоратора: те разрешаются раньше, и 304 ушёл бы без токена.
+    """
+    conditional_get(request, response, str(competition_id))
+
+
+def competitions_etag(request: Request, response: Response) -> None:
+    conditional_get(request, response, COMPETITIONS_KEY)
@@ -1,16 +1,221 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import threading
+import time
+from contextlib import asynccontextmanager
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker, declarative_base, Session
+from starlette.concurrency import run_in_threadpool
 from app.config import settings
 
+class PoolWaitStats:
+    """Сколько раз и как долго запросы ждали свободное соединение пула."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, waited: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+
+class InstrumentedPoolMixin:
+    # статистика живёт на классе движка, а не на экземпляре пула:
+    # dispose()/recreate() создают новый пул, счётчики при этом не сбрасываются
+    wait_stats: PoolWaitStats
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.wait_stats.record(time.perf_counter() - started, timed_out=True)
+            raise
+        self.wait_stats.record(time.perf_counter() - started)
+        return connection
+
+
+def instrumented_pool(base: type) -> type:
+    return type(f"Instrumented{base.__name__}", (InstrumentedPoolMixin, base), {"wait_stats": PoolWaitStats()})
+
+
+def _is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+
+def engine_options(url: str, pool_class: type) -> dict:
+    if not _is_sqlite(url):
+        return {
+            "poolclass": instrumented_pool(pool_class),
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "pool_timeout": settings.DB_POOL_TIMEOUT,
+            "pool_recycle": settings.DB_POOL_RECYCLE,
+            "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        }
+
+    options = {"connect_args": {"check_same_thread": False}}
+    if make_url(url).database not in (None, "", ":memory:"):
+        # файловая SQLite: обычный пул, у :memory: свой пул из одного соединения
+        options.update(
+            poolclass=instrumented_pool(pool_class),
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+        )
+    return options
+
+
+def configure_sqlite(engine) -> None:
+    """WAL + synchronous=NORMAL: табло читает, пока судьи пишут голоса."""
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+        cursor.close()
+
+
 # Настройка движка базы данных
-connect_args = {"check_same_thread": False} if settings.DATABASE_URL.startswith("sqlite") else {}
-engine = create_engine(settings.DATABASE_URL, echo=False, connect_args=connect_args)
+engine = create_engine(settings.DATABASE_URL, echo=False, **engine_options(settings.DATABASE_URL, QueuePool))
+if _is_sqlite(settings.DATABASE_URL):
+    configure_sqlite(engine)
 
 #Создание сессий
 SessionLocal = sessionmaker(bind=engine, expire_on_commit=False)
 # Базовый класс для моделей
 Base = declarative_base()
 
+
+# Асинхронные драйверы для тех же баз
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def async_database_url() -> str:
+    if settings.ASYNC_DATABASE_URL:
+        return settings.ASYNC_DATABASE_URL
+    url = make_url(settings.DATABASE_URL)
+    return url.set(drivername=ASYNC_DRIVERS[url.get_backend_name()]).render_as_string(hide_password=False)
+
+
+# Асинхронный движок включается настройкой ASYNC_DB
+async_engine = (
+    create_async_engine(
+        async_database_url(), echo=False, **engine_options(async_database_url(), AsyncAdaptedQueuePool)
+    )
+    if settings.ASYNC_DB else None
+)
+if async_engine is not None and _is_sqlite(async_database_url()):
+    configure_sqlite(async_engine.sync_engine)
+AsyncSessionLocal = (
+    async_sessionmaker(bind=async_engine, expire_on_commit=False) if async_engine else None
+)
+
+
+def pool_stats() -> dict:
+    """Состояние пулов соединений: занято, сверх лимита, ожидание свободного соединения."""
+    engines = {"sync": engine}
+    if async_engine is not None:
+        engines["async"] = async_engine.sync_engine
+
+    stats = {}
+    for name, current in engines.items():
+        pool = current.pool
+        item = {"pool": type(pool).__name__}
+        if isinstance(pool, QueuePool):
+            item.update(
+                size=pool.size(),
+                checked_in=pool.checkedin(),
+                checked_out=pool.checkedout(),
+                overflow=max(pool.overflow(), 0),
+                max_overflow=pool._max_overflow,
+            )
+        wait = getattr(pool, "wait_stats", None)
+        if wait is not None:
+            item.update(
+                checkouts=wait.checkouts,
+                timeouts=wait.timeouts,
+                wait_seconds_total=round(wait.wait_seconds_total, 6),
+                wait_seconds_max=round(wait.wait_seconds_max, 6),
+                wait_seconds_avg=round(wait.wait_seconds_total / wait.checkouts, 6) if wait.checkouts else 0.0,
+            )
+        stats[name] = item
+    return stats
+
+
+class ThreadedSession:
+    """
+    Синхронная сессия с интерфейсом AsyncSession (то подмножество,
+    которым пользуются маршруты): каждый запрос к БД уходит в пул потоков.
+    Позволяет писать маршруты один раз как async def и переключать
+    движок настройкой ASYNC_DB.
+    """
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    async def execute(self, statement, params=None, **kwargs):
+        def run():
+            result = self.session.execute(statement, params, **kwargs)
+            # строки выбираем сразу в потоке — как буферизованный результат AsyncSession;
+            # у UPDATE/DELETE строк нет, нужен только rowcount
+            if getattr(result, "returns_rows", True):
+                return result.freeze()()
+            return result
+        return await run_in_threadpool(run)
+
+    async def scalar(self, statement, params=None, **kwargs):
+        return await run_in_threadpool(self.session.scalar, statement, params, **kwargs)
+
+    async def get(self, entity, ident, **kwargs):
+        return await run_in_threadpool(self.session.get, entity, ident, **kwargs)
+
+    async def flush(self):
+        await run_in_threadpool(self.session.flush)
+
+    async def commit(self):
+        await run_in_threadpool(self.session.commit)
+
+    async def rollback(self):
+        await run_in_threadpool(self.session.rollback)
+
+    async def refresh(self, instance, attribute_names=None):
+        await run_in_threadpool(self.session.refresh, instance, attribute_names)
+
+    async def close(self):
+        await run_in_threadpool(self.session.close)
+
+    async def run_sync(self, fn, *args, **kwargs):
+        # как AsyncSession.run_sync: несколько операций за один переход в пул потоков
+        return await run_in_threadpool(fn, self.session, *args, **kwargs)
+
+    def add(self, instance):
+        self.session.add(instance)
+
+    def add_all(self, instances):
+        self.session.add_all(instances)
+
+    def expunge(self, instance):
+        self.session.expunge(instance)
+
+
 # Зависимость для FastAPI маршрутов
 def get_db():
     db = SessionLocal()
@@ -19,6 +224,27 @@ def get_db():
     finally:
         db.close()
 
+
+# AsyncSession или синхронная сессия в пуле потоков
+@asynccontextmanager
+async def async_session():
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as db:
+            yield db
+        return
+
+    db = ThreadedSession(SessionLocal())
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
+# Зависимость для async-маршрутов
+async def get_async_db():
+    async with async_session() as db:
+        yield db
+
 # Инициализация таблиц
 def init_db():
     from app import models
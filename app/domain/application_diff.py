@@ -0,0 +1,59 @@
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Iterable
+
+# Спортсмен заявки узнаётся по ФИО и дате рождения
+ATHLETE_IDENTITY = ("last_name", "first_name", "middle_name", "birth_date")
+# Поля, которые можно менять у уже заявленного спортсмена
+ATHLETE_FIELDS = ("gender", "weight_category", "entry_total", "is_main")
+
+
+def athlete_key(athlete) -> tuple:
+    return tuple(getattr(athlete, name) for name in ATHLETE_IDENTITY)
+
+
+def _plain(value):
+    # Gender из модели и строка из схемы сравниваются по значению
+    return getattr(value, "value", value)
+
+
+@dataclass
+class AthleteDiff:
+    inserts: list = field(default_factory=list)   # новые спортсмены из запроса
+    updates: list[dict] = field(default_factory=list)   # {"id": ..., изменённые поля}
+    deletes: list = field(default_factory=list)   # id строк, которых больше нет в заявке
+
+    @property
+    def empty(self) -> bool:
+        return not (self.inserts or self.updates or self.deletes)
+
+
+def diff_athletes(existing: Iterable, incoming: Iterable) -> AthleteDiff:
+    """
+    Сопоставляет спортсменов из запроса с уже сохранёнными по ATHLETE_IDENTITY.
+    Совпавшие сохраняют id (на них ссылается жеребьёвка) и обновляются
+    только если изменились их поля.
+    """
+    by_key = defaultdict(list)
+    for row in existing:
+        by_key[athlete_key(row)].append(row)
+
+    diff = AthleteDiff()
+
+    for athlete in incoming:
+        matches = by_key.get(athlete_key(athlete))
+        if not matches:
+            diff.inserts.append(athlete)
+            continue
+
+        row = matches.pop(0)
+        changes = {
+            name: getattr(athlete, name)
+            for name in ATHLETE_FIELDS
+            if _plain(getattr(athlete, name)) != _plain(getattr(row, name))
+        }
+        if changes:
+            diff.updates.append({"id": row.id, **changes})
+
+    diff.deletes = [row.id for rows in by_key.values() for row in rows]
+    return diff
@@ -0,0 +1,96 @@
+import random
+import secrets
+from collections import defaultdict
+from datetime import datetime
+from typing import Iterable, NamedTuple
+from uuid import UUID, uuid4
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from app.domain.standings import category_key
+from app.models import Application, ApplicationAthlete, ApplicationStatus
+from app.models.draw import CompetitionDrawEntry
+
+MAX_GROUP_SIZE = 12
+
+
+class DrawAthlete(NamedTuple):
+    id: UUID
+    gender: str
+    weight_category: str
+    entry_total: float | None
+
+
+def new_seed() -> int:
+    # помещается в BIGINT
+    return secrets.randbits(63)
+
+
+def load_athletes(db: Session, competition_id: UUID) -> list[DrawAthlete]:
+    """Атлеты verified-заявок — только нужные колонки, без ORM-объектов."""
+    rows = db.execute(
+        select(
+            ApplicationAthlete.id,
+            ApplicationAthlete.gender,
+            ApplicationAthlete.weight_category,
+            ApplicationAthlete.entry_total,
+        )
+        .join(Application, ApplicationAthlete.application_id == Application.id)
+        .where(
+            Application.competition_id == competition_id,
+            Application.status == ApplicationStatus.verified,
+        )
+    )
+    return [
+        DrawAthlete(athlete_id, getattr(gender, "value", gender), weight_category, entry_total)
+        for athlete_id, gender, weight_category, entry_total in rows
+    ]
+
+
+def compute_draw(competition_id: UUID, athletes: Iterable[DrawAthlete], seed: int) -> list[dict]:
+    """
+    Разбивка на группы и жребий. Результат зависит только от состава и seed:
+    та же жеребьёвка воспроизводится для проверки по сохранённому seed.
+    """
+    rng = random.Random(seed)
+
+    # Группируем по полу + категории
+    buckets: dict[tuple[str, str], list[DrawAthlete]] = defaultdict(list)
+    for a in athletes:
+        buckets[(a.gender, a.weight_category)].append(a)
+
+    created_at = datetime.utcnow()
+    rows = []
+
+    # порядок обхода и сортировки фиксирован, иначе seed не воспроизводит жребий
+    for gender, cat in sorted(buckets, key=lambda k: (k[0], category_key(k[1]), k[1])):
+        # сортировка по заявленному тоталу
+        bucket = sorted(buckets[(gender, cat)], key=lambda a: (-(a.entry_total or 0), str(a.id)))
+
+        for idx in range(0, len(bucket), MAX_GROUP_SIZE):
+            group = bucket[idx:idx + MAX_GROUP_SIZE]
+            letter = chr(ord("A") + idx // MAX_GROUP_SIZE)
+
+            rng.shuffle(group)
+
+            for lot, a in enumerate(group, start=1):
+                rows.append({
+                    "id": uuid4(),
+                    "competition_id": competition_id,
+                    "athlete_id": a.id,
+                    "gender": gender,
+                    "weight_category": cat,
+                    "group_letter": letter,
+                    "lot_number": lot,
+                    "entry_total": a.entry_total,
+                    "created_at": created_at,
+                })
+
+    return rows
+
+
+def write_draw(db: Session, rows: list[dict]) -> None:
+    """Все участники жеребьёвки одним executemany-INSERT (без commit)."""
+    if rows:
+        db.execute(insert(CompetitionDrawEntry), rows)
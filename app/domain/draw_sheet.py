@@ -0,0 +1,98 @@
+import hashlib
+import threading
+from collections import defaultdict
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app import schemas
+from app.models import ApplicationAthlete
+from app.models.draw import CompetitionDrawEntry
+
+
+def render_draw_sheet(db: Session, competition_id: UUID) -> bytes | None:
+    """Протокол жеребьёвки в готовом JSON. None — жеребьёвка ещё не проведена."""
+    rows = db.execute(
+        select(
+            CompetitionDrawEntry.gender,
+            CompetitionDrawEntry.weight_category,
+            CompetitionDrawEntry.group_letter,
+            CompetitionDrawEntry.lot_number,
+            CompetitionDrawEntry.entry_total,
+            ApplicationAthlete.id,
+            ApplicationAthlete.last_name,
+            ApplicationAthlete.first_name,
+        )
+        .join(ApplicationAthlete, CompetitionDrawEntry.athlete_id == ApplicationAthlete.id)
+        .where(CompetitionDrawEntry.competition_id == competition_id)
+        .order_by(
+            CompetitionDrawEntry.gender,
+            CompetitionDrawEntry.weight_category,
+            CompetitionDrawEntry.group_letter,
+            CompetitionDrawEntry.lot_number,
+        )
+    ).all()
+
+    if not rows:
+        return None
+
+    groups_map: dict[tuple[str, str, str], list[schemas.DrawAthleteOut]] = defaultdict(list)
+
+    for gender, cat, letter, lot_number, entry_total, athlete_id, last_name, first_name in rows:
+        groups_map[(gender, cat, letter)].append(
+            schemas.DrawAthleteOut(
+                athlete_id=athlete_id,
+                last_name=last_name,
+                first_name=first_name,
+                gender=gender,
+                weight_category=cat,
+                entry_total=entry_total,
+                group_letter=letter,
+                lot_number=lot_number,
+            )
+        )
+
+    sheet = schemas.DrawResultOut(
+        competition_id=competition_id,
+        groups=[
+            schemas.DrawGroupOut(gender=gender, weight_category=cat, group_letter=letter, athletes=athletes)
+            for (gender, cat, letter), athletes in groups_map.items()
+        ],
+    )
+    return sheet.model_dump_json().encode()
+
+
+class DrawSheetCache:
+    """
+    Готовые протоколы жеребьёвки: competition_id -> (ETag, тело ответа).
+    После жеребьёвки протокол не меняется, поэтому запись не устаревает.
+    ETag — хэш содержимого: у всех воркеров он одинаковый.
+    """
+
+    def __init__(self):
+        self.sheets: dict[str, tuple[str, bytes]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, competition_id: UUID) -> tuple[str, bytes] | None:
+        key = str(competition_id)
+        sheet = self.sheets.get(key)
+        if sheet is not None:
+            return sheet
+        return self.build(db, competition_id)
+
+    def build(self, db: Session, competition_id: UUID) -> tuple[str, bytes] | None:
+        body = render_draw_sheet(db, competition_id)
+        if body is None:
+            return None
+
+        sheet = (f'"{hashlib.sha256(body).hexdigest()[:32]}"', body)
+        with self._lock:
+            return self.sheets.setdefault(str(competition_id), sheet)
+
+    def invalidate(self, competition_id: UUID | str) -> None:
+        with self._lock:
+            self.sheets.pop(str(competition_id), None)
+
+
+draw_sheets = DrawSheetCache()
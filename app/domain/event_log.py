@@ -0,0 +1,83 @@
+from uuid import UUID
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import SessionLocal
+from app.models import CompetitionEvent, CompetitionSnapshot
+
+
+async def append(db: AsyncSession, competition_id: UUID | str, events: list[dict]) -> list[dict]:
+    """
+    Записывает события в журнал в той же транзакции, что и само изменение
+    (commit делает вызывающий). Каждому событию проставляется seq.
+    Один INSERT ... RETURNING на весь пакет: seq генерирует БД, и через
+    add_all + flush ORM вставлял бы события по одному.
+
+    Строки VALUES получают seq по порядку (rowid в SQLite, nextval в Postgres),
+    но RETURNING порядок не обещает — поэтому seq сортируются.
+    sort_by_parameter_order не подходит: без столбца-метки SQLite
+    с ним снова вставляет по одной строке.
+    """
+    if not events:
+        return events
+
+    seqs = (
+        await db.execute(
+            insert(CompetitionEvent).returning(CompetitionEvent.seq),
+            [
+                {"competition_id": UUID(str(competition_id)), "type": event["type"], "payload": event}
+                for event in events
+            ],
+        )
+    ).scalars().all()
+
+    for seq, event in zip(sorted(seqs), events):
+        event["seq"] = seq
+    return events
+
+
+async def last_seq(db: AsyncSession, competition_id: UUID) -> int:
+    return await db.scalar(
+        select(func.coalesce(func.max(CompetitionEvent.seq), 0))
+        .where(CompetitionEvent.competition_id == competition_id)
+    )
+
+
+async def latest_snapshot(db: AsyncSession, competition_id: UUID) -> CompetitionSnapshot | None:
+    return (
+        await db.execute(
+            select(CompetitionSnapshot)
+            .where(CompetitionSnapshot.competition_id == competition_id)
+            .order_by(CompetitionSnapshot.last_seq.desc())
+            .limit(1)
+        )
+    ).scalar_one_or_none()
+
+
+async def events_after(db: AsyncSession, competition_id: UUID, seq: int, limit: int | None = None) -> list[dict]:
+    payloads = (
+        await db.execute(
+            select(CompetitionEvent.seq, CompetitionEvent.payload)
+            .where(CompetitionEvent.competition_id == competition_id, CompetitionEvent.seq > seq)
+            .order_by(CompetitionEvent.seq)
+            .limit(limit)
+        )
+    ).all()
+    return [{**payload, "seq": event_seq} for event_seq, payload in payloads]
+
+
+async def closed_seqs(db: AsyncSession, competition_id: UUID) -> dict[str, int]:
+    """attempt_id -> seq события attempt_closed: порядок, в котором результаты показаны."""
+    rows = await db.execute(
+        select(CompetitionEvent.seq, CompetitionEvent.payload)
+        .where(CompetitionEvent.competition_id == competition_id, CompetitionEvent.type == "attempt_closed")
+    )
+    return {payload["attempt_id"]: seq for seq, payload in rows}
+
+
+def save_snapshot(competition_id: str, seq: int, state: dict) -> None:
+    """Фоновая задача после ответа: снимок пишется отдельной сессией."""
+    with SessionLocal() as db:
+        db.add(CompetitionSnapshot(competition_id=UUID(competition_id), last_seq=seq, state=state))
+        db.commit()
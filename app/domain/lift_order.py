@@ -0,0 +1,67 @@
+import heapq
+import itertools
+from typing import Iterator
+
+# Порядок вызова по правилам IWF: сначала весь рывок, затем толчок;
+# внутри упражнения — меньший вес, меньший номер подхода, меньший номер жребия
+PHASES = {"snatch": 0, "clean_and_jerk": 1}
+
+LiftKey = tuple[int, int, int, int, str]
+
+
+def lift_key(lift_type: str, weight: int, attempt_number: int, lot: int, attempt_id: str) -> LiftKey:
+    # id в конце — детерминированный порядок при полном совпадении
+    return PHASES.get(lift_type, len(PHASES)), weight, attempt_number, lot, attempt_id
+
+
+class LiftOrder:
+    """
+    Очередь вызова заявленных подходов: куча с ленивым удалением.
+    Смена веса или номера подхода — новый ключ в куче (O(log n)),
+    старая запись остаётся и отбрасывается при чтении вершины.
+    """
+
+    def __init__(self):
+        self._heap: list[tuple[LiftKey, int, str]] = []
+        self._keys: dict[str, LiftKey] = {}
+        self._counter = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, attempt_id: str) -> bool:
+        return attempt_id in self._keys
+
+    def push(self, attempt_id: str, key: LiftKey) -> None:
+        if self._keys.get(attempt_id) == key:
+            return
+        self._keys[attempt_id] = key
+        heapq.heappush(self._heap, (key, next(self._counter), attempt_id))
+        self._compact()
+
+    def remove(self, attempt_id: str) -> None:
+        self._keys.pop(attempt_id, None)
+
+    def _stale(self, item: tuple[LiftKey, int, str]) -> bool:
+        key, _, attempt_id = item
+        return self._keys.get(attempt_id) != key
+
+    def _compact(self) -> None:
+        # устаревших записей не больше, чем живых — иначе куча пересобирается
+        if len(self._heap) > 2 * len(self._keys) + 16:
+            self._heap = [item for item in self._heap if not self._stale(item)]
+            heapq.heapify(self._heap)
+
+    def peek(self) -> str | None:
+        """Следующий подход, амортизированно O(1)."""
+        while self._heap and self._stale(self._heap[0]):
+            heapq.heappop(self._heap)
+        return self._heap[0][2] if self._heap else None
+
+    def ordered(self, limit: int | None = None) -> Iterator[str]:
+        """Очередь целиком (или первые limit) — без изменения кучи."""
+        if limit is None:
+            items = sorted(self._keys.items(), key=lambda item: item[1])
+        else:
+            items = heapq.nsmallest(limit, self._keys.items(), key=lambda item: item[1])
+        return (attempt_id for attempt_id, _ in items)
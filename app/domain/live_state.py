@@ -0,0 +1,608 @@
+import json
+import threading
+import time
+from bisect import insort
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from uuid import UUID
+
+from fastapi import BackgroundTasks
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.core.broadcast import manager
+from app.domain import event_log
+from app.domain.lift_order import LiftOrder, lift_key
+from app.domain.standings import compute_standings
+from app.models import ApplicationAthlete, Attempt, CompetitionDrawEntry, Vote
+
+# Служебный канал шины: события живого состояния для остальных воркеров
+LIVE_STATE_CHANNEL = "live_state"
+
+
+def athlete_full_name(last_name, first_name, middle_name) -> str:
+    return " ".join(filter(None, [last_name, first_name, middle_name]))
+
+
+def _is_better(attempt: "AttemptState", best: int, best_seq: int | None) -> bool:
+    # при равном весе лучше тот, кто взял его раньше
+    if attempt.weight != best:
+        return attempt.weight > best
+    return best_seq is not None and attempt.closed_seq is not None and attempt.closed_seq < best_seq
+
+
+@dataclass
+class EntryState:
+    id: str
+    athlete_id: str
+    athlete_name: str
+    gender: str
+    weight_category: str
+    group: str
+    lot: int
+    entry_total: int | None
+    best_snatch: int = 0
+    best_clean_and_jerk: int = 0
+    # seq закрытия попытки с лучшим весом — кто взял его раньше, при равенстве
+    snatch_seq: int | None = None
+    clean_and_jerk_seq: int | None = None
+
+    @property
+    def total(self) -> int:
+        if not self.best_snatch or not self.best_clean_and_jerk:
+            return 0
+        return self.best_snatch + self.best_clean_and_jerk
+
+
+@dataclass
+class AttemptState:
+    id: str
+    draw_entry_id: str
+    lift_type: str
+    weight: int
+    status: str
+    result: str | None
+    created_at: datetime
+    # номер подхода в упражнении (1, 2, 3) — по порядку заявки
+    number: int = 1
+    # seq события attempt_closed: порядок, в котором показаны результаты
+    # (created_at — время заявки, у пакета заявок он в порядке тела запроса)
+    closed_seq: int | None = None
+    votes: dict[str, bool] = field(default_factory=dict)
+
+
+class CompetitionState:
+    """
+    Живое состояние одного соревнования: участники жеребьёвки,
+    попытки, голоса и лучшие результаты атлетов.
+    Загружается из БД один раз, дальше обновляется событиями
+    (attempt_declared / attempt_weight_changed / attempt_started /
+    vote_cast / attempt_closed).
+    Все события идемпотентны — повторное применение ничего не меняет.
+    """
+
+    def __init__(self, competition_id: str):
+        self.competition_id = competition_id
+        self.entries: dict[str, EntryState] = {}
+        self.attempts: dict[str, AttemptState] = {}
+        self.active: dict[str, AttemptState] = {}
+        # закрытые попытки в порядке created_at — готовые строки для /results
+        self._closed: list[tuple[datetime, str, dict]] = []
+        # протокол пересчитывается только после засчитанной попытки
+        self._standings: list[dict] | None = None
+        # очередь вызова заявленных подходов
+        self.order = LiftOrder()
+        # сколько подходов заявлено: (draw_entry_id, lift_type) -> n
+        self._numbers: dict[tuple[str, str], int] = {}
+        # последнее применённое событие журнала и последний снимок
+        self.seq = 0
+        self.snapshot_seq = 0
+        self.lock = threading.RLock()
+
+    # ---------- загрузка ----------
+
+    async def hydrate(self, db: AsyncSession, use_snapshot: bool = True) -> None:
+        """Снимок + хвост журнала; без снимка (или use_snapshot=False) — из таблиц."""
+        competition_id = UUID(self.competition_id)
+
+        snapshot = await event_log.latest_snapshot(db, competition_id) if use_snapshot else None
+        if snapshot is not None:
+            self.load_snapshot(snapshot.state)
+            self.seq = self.snapshot_seq = snapshot.last_seq
+            # события, закоммиченные позже снимка, могут иметь меньший seq —
+            # перечитываем с запасом, повторное применение ничего не меняет
+            tail_from = max(snapshot.last_seq - settings.LIVE_SNAPSHOT_OVERLAP, 0)
+            for event in await event_log.events_after(db, competition_id, tail_from):
+                self.apply(event)
+            return
+
+        # seq читаем до таблиц: всё, что позже, придёт событиями
+        self.seq = await event_log.last_seq(db, competition_id)
+        await self._hydrate_tables(db, competition_id)
+
+    async def replay(self, db: AsyncSession) -> None:
+        """
+        Состояние только из журнала (участники — из жеребьёвки):
+        детерминированный пересчёт результатов для проверки.
+        """
+        competition_id = UUID(self.competition_id)
+        await self._hydrate_tables(db, competition_id, with_attempts=False)
+        for event in await event_log.events_after(db, competition_id, 0):
+            self.apply(event)
+
+    async def _hydrate_tables(self, db: AsyncSession, competition_id: UUID, with_attempts: bool = True) -> None:
+        # порядок закрытия попыток есть только в журнале — нужен до _close
+        closed_seqs = await event_log.closed_seqs(db, competition_id) if with_attempts else {}
+
+        # Один запрос: участники жеребьёвки + атлеты + все их попытки
+        rows = await db.execute(
+            select(
+                CompetitionDrawEntry.id,
+                CompetitionDrawEntry.athlete_id,
+                CompetitionDrawEntry.gender,
+                CompetitionDrawEntry.weight_category,
+                CompetitionDrawEntry.group_letter,
+                CompetitionDrawEntry.lot_number,
+                CompetitionDrawEntry.entry_total,
+                ApplicationAthlete.last_name,
+                ApplicationAthlete.first_name,
+                ApplicationAthlete.middle_name,
+                Attempt.id,
+                Attempt.lift_type,
+                Attempt.weight,
+                Attempt.status,
+                Attempt.result,
+                Attempt.created_at,
+            )
+            .join(ApplicationAthlete, CompetitionDrawEntry.athlete_id == ApplicationAthlete.id)
+            .outerjoin(Attempt, Attempt.draw_entry_id == CompetitionDrawEntry.id)
+            .where(CompetitionDrawEntry.competition_id == competition_id)
+            # номер подхода определяется порядком заявки
+            .order_by(Attempt.created_at)
+        )
+        for (
+            entry_id, athlete_id, gender, weight_category, group_letter, lot_number, entry_total,
+            last_name, first_name, middle_name,
+            attempt_id, lift_type, weight, status, result, created_at,
+        ) in rows:
+            key = str(entry_id)
+            if key not in self.entries:
+                self.entries[key] = EntryState(
+                    id=key,
+                    athlete_id=str(athlete_id),
+                    athlete_name=athlete_full_name(last_name, first_name, middle_name),
+                    gender=gender,
+                    weight_category=weight_category,
+                    group=group_letter,
+                    lot=lot_number,
+                    entry_total=entry_total,
+                )
+
+            if attempt_id is not None and with_attempts:
+                self._add_attempt(
+                    AttemptState(
+                        id=str(attempt_id),
+                        draw_entry_id=key,
+                        lift_type=lift_type,
+                        weight=weight,
+                        status=status,
+                        result=result,
+                        created_at=created_at,
+                        closed_seq=closed_seqs.get(str(attempt_id)),
+                    )
+                )
+
+        if self.active:
+            votes = await db.execute(
+                select(Vote.attempt_id, Vote.user_id, Vote.vote)
+                .where(Vote.attempt_id.in_([UUID(i) for i in self.active]), Vote.role == "judge")
+            )
+            for attempt_id, user_id, vote in votes:
+                self.active[str(attempt_id)].votes[str(user_id)] = vote
+
+    # ---------- события ----------
+
+    def load_snapshot(self, data: dict) -> None:
+        for entry in data["entries"]:
+            self.entries[entry["id"]] = EntryState(**entry)
+        # в порядке заявки — так же, как при загрузке из таблиц
+        for attempt in data["attempts"]:
+            self._add_attempt(
+                AttemptState(
+                    id=attempt["id"],
+                    draw_entry_id=attempt["draw_entry_id"],
+                    lift_type=attempt["lift_type"],
+                    weight=attempt["weight"],
+                    status=attempt["status"],
+                    result=attempt["result"],
+                    created_at=datetime.fromisoformat(attempt["created_at"]),
+                    votes=attempt["votes"],
+                    closed_seq=attempt.get("closed_seq"),
+                )
+            )
+
+    def to_snapshot(self) -> dict:
+        with self.lock:
+            # лучшие результаты, протокол и очередь вызова выводятся из попыток
+            derived = ("best_snatch", "best_clean_and_jerk", "snatch_seq", "clean_and_jerk_seq")
+            return {
+                "entries": [
+                    {k: v for k, v in asdict(entry).items() if k not in derived}
+                    for entry in self.entries.values()
+                ],
+                "attempts": [
+                    {
+                        "id": a.id,
+                        "draw_entry_id": a.draw_entry_id,
+                        "lift_type": a.lift_type,
+                        "weight": a.weight,
+                        "status": a.status,
+                        "result": a.result,
+                        "created_at": a.created_at.isoformat(),
+                        "votes": dict(a.votes),
+                        "closed_seq": a.closed_seq,
+                    }
+                    for a in sorted(self.attempts.values(), key=lambda a: (a.created_at, a.id))
+                ],
+            }
+
+    def apply(self, event: dict) -> bool:
+        """Применяет событие. False — состояние не может его применить и должно быть перезагружено."""
+        with self.lock:
+            self.seq = max(self.seq, event.get("seq", 0))
+            kind = event["type"]
+
+            if kind == "attempt_declared":
+                data = event["attempt"]
+                if data["draw_entry_id"] not in self.entries:
+                    return False
+                if data["id"] not in self.attempts:
+                    self._add_attempt(
+                        AttemptState(
+                            id=data["id"],
+                            draw_entry_id=data["draw_entry_id"],
+                            lift_type=data["lift_type"],
+                            weight=data["weight"],
+                            status=data["status"],
+                            result=None,
+                            created_at=datetime.fromisoformat(data["created_at"]),
+                        )
+                    )
+                return True
+
+            attempt = self.attempts.get(event["attempt_id"])
+            if attempt is None:
+                return False
+
+            if kind == "attempt_weight_changed":
+                if attempt.status == "declared":
+                    attempt.weight = event["weight"]
+                    self._queue(attempt)
+
+            elif kind == "attempt_started":
+                if attempt.status != "closed":
+                    attempt.status = "active"
+                    self.active[attempt.id] = attempt
+                    self.order.remove(attempt.id)
+
+            elif kind == "vote_cast":
+                if attempt.status == "active":
+                    attempt.votes[event["user_id"]] = event["vote"]
+
+            elif kind == "attempt_closed":
+                if attempt.status != "closed":
+                    attempt.status = "closed"
+                    attempt.result = event["result"]
+                    attempt.closed_seq = event.get("seq")
+                    self.active.pop(attempt.id, None)
+                    self.order.remove(attempt.id)
+                    self._close(attempt)
+
+            return True
+
+    def _add_attempt(self, attempt: AttemptState) -> None:
+        lift = (attempt.draw_entry_id, attempt.lift_type)
+        attempt.number = self._numbers[lift] = self._numbers.get(lift, 0) + 1
+
+        self.attempts[attempt.id] = attempt
+        if attempt.status == "active":
+            self.active[attempt.id] = attempt
+        elif attempt.status == "closed":
+            self._close(attempt)
+        elif attempt.status == "declared":
+            self._queue(attempt)
+
+    def _queue(self, attempt: AttemptState) -> None:
+        entry = self.entries[attempt.draw_entry_id]
+        self.order.push(
+            attempt.id,
+            lift_key(attempt.lift_type, attempt.weight, attempt.number, entry.lot, attempt.id),
+        )
+
+    def _close(self, attempt: AttemptState) -> None:
+        entry = self.entries.get(attempt.draw_entry_id)
+        if entry is None:
+            return
+
+        if attempt.result == "passed":
+            if attempt.lift_type == "snatch":
+                if _is_better(attempt, entry.best_snatch, entry.snatch_seq):
+                    entry.best_snatch = attempt.weight
+                    entry.snatch_seq = attempt.closed_seq
+            elif _is_better(attempt, entry.best_clean_and_jerk, entry.clean_and_jerk_seq):
+                entry.best_clean_and_jerk = attempt.weight
+                entry.clean_and_jerk_seq = attempt.closed_seq
+            self._standings = None
+
+        insort(
+            self._closed,
+            (
+                attempt.created_at,
+                attempt.id,
+                {
+                    "attempt_id": attempt.id,
+                    "lift_type": attempt.lift_type,
+                    "weight": attempt.weight,
+                    "result": attempt.result,  # passed / failed
+                    "athlete": {
+                        "name": entry.athlete_name,
+                        "group": entry.group,
+                        "weight_category": entry.weight_category,
+                        "lot": entry.lot,
+                    },
+                },
+            ),
+            key=lambda row: (row[0], row[1]),
+        )
+
+    # ---------- чтение ----------
+
+    def current_attempt(self) -> dict | None:
+        with self.lock:
+            if not self.active:
+                return None
+            attempt = max(self.active.values(), key=lambda a: a.created_at)
+            return self.attempt_payload(attempt.id)
+
+    def attempt_payload(self, attempt_id: str) -> dict:
+        with self.lock:
+            attempt = self.attempts[attempt_id]
+            entry = self.entries[attempt.draw_entry_id]
+            return {
+                "id": attempt.id,
+                "weight": attempt.weight,
+                "lift_type": attempt.lift_type,
+                "draw_entry": {
+                    "group": entry.group,
+                    "weight_category": entry.weight_category,
+                    "lot": entry.lot,
+                    "athlete_name": entry.athlete_name,
+                },
+            }
+
+    def results(self) -> list[dict]:
+        with self.lock:
+            return [row for _, _, row in self._closed]
+
+    def standings(self) -> list[dict]:
+        with self.lock:
+            if self._standings is None:
+                self._standings = compute_standings(self.entries.values())
+            return self._standings
+
+    def order_item(self, attempt_id: str) -> dict:
+        attempt = self.attempts[attempt_id]
+        entry = self.entries[attempt.draw_entry_id]
+        return {
+            "attempt_id": attempt.id,
+            "draw_entry_id": entry.id,
+            "athlete_name": entry.athlete_name,
+            "group": entry.group,
+            "weight_category": entry.weight_category,
+            "lot": entry.lot,
+            "lift_type": attempt.lift_type,
+            "attempt_number": attempt.number,
+            "weight": attempt.weight,
+        }
+
+    def next_attempt(self) -> dict | None:
+        with self.lock:
+            attempt_id = self.order.peek()
+            return self.order_item(attempt_id) if attempt_id else None
+
+    def lift_order(self, limit: int | None = None) -> list[dict]:
+        """Заявленные, но ещё не выполненные подходы в порядке вызова."""
+        with self.lock:
+            return [self.order_item(attempt_id) for attempt_id in self.order.ordered(limit)]
+
+    def lift_order_message(self, limit: int = 10) -> dict:
+        with self.lock:
+            return {
+                "type": "lift_order",
+                "next": self.next_attempt(),
+                "order": self.lift_order(limit),
+            }
+
+
+# запас на конверт сообщения шины: канал, competition_id, скобки
+ENVELOPE_RESERVE = 256
+
+
+def split_events(events: list[dict], limit: int | None) -> list[list[dict]]:
+    """Последовательные куски, каждый не больше limit байт в JSON."""
+    if limit is None:
+        return [events]
+
+    chunks, chunk, size = [], [], 0
+    for event in events:
+        event_size = len(json.dumps(event).encode()) + 1
+        if chunk and size + event_size > limit:
+            chunks.append(chunk)
+            chunk, size = [], 0
+        chunk.append(event)
+        size += event_size
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+class LiveStateRegistry:
+    """
+    Живые состояния соревнований в памяти воркера.
+
+    События, пришедшие, пока состояние загружается, копятся в буфере
+    загрузки и применяются к нему после чтения: чтение могло пройти до
+    commit этих событий. invalidate (перезапуск жеребьёвки) повышает
+    поколение — загрузка, начатая раньше, в реестр не попадает.
+    Раз в TTL состояние перечитывается из таблиц: сообщение шины могло
+    потеряться (unix-шина при переполнении сокета его отбрасывает).
+    """
+
+    def __init__(self, ttl: float = settings.LIVE_STATE_TTL_SECONDS):
+        self.ttl = ttl
+        self.states: dict[str, CompetitionState] = {}
+        self.loaded_at: dict[str, float] = {}
+        self.generations: dict[str, int] = {}
+        # competition_id -> буферы событий идущих загрузок
+        self.loading: dict[str, list[list[dict]]] = {}
+
+    async def get(self, db: AsyncSession, competition_id: UUID | str) -> CompetitionState:
+        key = str(competition_id)
+        state = self.states.get(key)
+        if state is not None and (
+            time.monotonic() - self.loaded_at.get(key, 0) < self.ttl
+            # перечитывание уже идёт — пока отвечаем текущим состоянием
+            or key in self.loading
+        ):
+            return state
+
+        generation = self.generations.get(key, 0)
+        buffer: list[dict] = []
+        self.loading.setdefault(key, []).append(buffer)
+        try:
+            fresh = CompetitionState(key)
+            # первая загрузка — со снимка, перечитывание по TTL — из таблиц:
+            # снимок мог записать воркер, пропустивший событие
+            await fresh.hydrate(db, use_snapshot=state is None)
+        finally:
+            buffers = self.loading[key]
+            buffers.remove(buffer)
+            if not buffers:
+                del self.loading[key]
+
+        applied = all([fresh.apply(event) for event in buffer])
+        if applied and self.generations.get(key, 0) == generation:
+            self.states[key] = fresh
+            self.loaded_at[key] = time.monotonic()
+        return fresh
+
+    def invalidate(self, competition_id: UUID | str) -> None:
+        key = str(competition_id)
+        self.generations[key] = self.generations.get(key, 0) + 1
+        self.states.pop(key, None)
+
+    def apply(self, competition_id: UUID | str, event: dict) -> None:
+        key = str(competition_id)
+        for buffer in self.loading.get(key, ()):
+            buffer.append(event)
+        state = self.states.get(key)
+        if state is not None and not state.apply(event):
+            self.invalidate(key)
+
+    def publish(
+        self,
+        competition_id: UUID | str,
+        event: dict,
+        background_tasks: BackgroundTasks,
+    ) -> None:
+        """Вызывается после commit: применяем здесь сразу, остальным воркерам — через шину."""
+        self.publish_all(competition_id, [event], background_tasks)
+
+    def publish_all(
+        self,
+        competition_id: UUID | str,
+        events: list[dict],
+        background_tasks: BackgroundTasks,
+    ) -> None:
+        """
+        События одной транзакции — одним сообщением шины, а если не влезают
+        в предел шины (NOTIFY — 8000 байт) — несколькими, по порядку.
+        """
+        for event in events:
+            self.apply(competition_id, event)
+        limit = manager.bus.max_payload
+        for chunk in split_events(events, limit - ENVELOPE_RESERVE if limit else None):
+            background_tasks.add_task(
+                manager.broadcast,
+                LIVE_STATE_CHANNEL,
+                {"competition_id": str(competition_id), "events": chunk},
+            )
+
+        # снимок пишет тот воркер, который накопил достаточно событий
+        key = str(competition_id)
+        state = self.states.get(key)
+        if state is not None and state.seq - state.snapshot_seq >= settings.LIVE_SNAPSHOT_EVERY:
+            state.snapshot_seq = state.seq
+            background_tasks.add_task(event_log.save_snapshot, key, state.seq, state.to_snapshot())
+
+
+live_states = LiveStateRegistry()
+
+
+def _apply_message(message: dict) -> None:
+    for event in message["events"]:
+        live_states.apply(message["competition_id"], event)
+
+
+manager.add_listener(LIVE_STATE_CHANNEL, _apply_message)
+
+
+def feed_message(event: dict, state: CompetitionState | None = None) -> dict | None:
+    """
+    Событие журнала -> сообщение табло. seq сообщения — seq события:
+    по нему клиент докачивает пропущенное после переподключения.
+    """
+    kind = event["type"]
+
+    if kind == "attempt_started":
+        if state is None or event["attempt_id"] not in state.attempts:
+            return None
+        return {"type": "attempt_started", "seq": event["seq"], "attempt": state.attempt_payload(event["attempt_id"])}
+
+    if kind == "vote_cast":
+        return {
+            "type": "vote_submitted",
+            "seq": event["seq"],
+            "attempt_id": event["attempt_id"],
+            "user_id": event["user_id"],
+            "vote": event["vote"],
+        }
+
+    if kind == "attempt_closed":
+        return {
+            "type": "attempt_closed",
+            "seq": event["seq"],
+            "attempt_id": event["attempt_id"],
+            "result": event["result"],
+            "white": event.get("white"),
+            "red": event.get("red"),
+        }
+
+    # заявки и смены весов табло получает через lift_order
+    return None
+
+
+def attempt_declared_event(attempt: Attempt) -> dict:
+    return {
+        "type": "attempt_declared",
+        "attempt": {
+            "id": str(attempt.id),
+            "draw_entry_id": str(attempt.draw_entry_id),
+            # lift_type может быть ещё LiftType из схемы — храним строку
+            "lift_type": getattr(attempt.lift_type, "value", attempt.lift_type),
+            "weight": attempt.weight,
+            "status": attempt.status,
+            "created_at": attempt.created_at.isoformat(),
+        },
+    }
@@ -0,0 +1,79 @@
+import math
+import re
+from collections import defaultdict
+from typing import Callable, Iterable, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from app.domain.live_state import EntryState
+
+
+def category_key(weight_category: str) -> tuple[float, bool]:
+    # "73" < "81" < "109" < "+109" / "109+"
+    match = re.search(r"\d+", weight_category)
+    weight = float(match.group()) if match else float("inf")
+    return weight, "+" in weight_category
+
+
+def _rank(
+    entries: list["EntryState"],
+    value: Callable[["EntryState"], int],
+    achieved_seq: Callable[["EntryState"], int | None],
+) -> dict[str, int]:
+    """
+    Места по одному показателю. При равенстве выше тот, кто показал
+    результат раньше (seq закрытия попытки), затем — меньший номер жребия.
+    Собственного веса атлета в модели нет, поэтому этот показатель не учитывается.
+    """
+    ranked = sorted(
+        (e for e in entries if value(e) > 0),
+        key=lambda e: (-value(e), achieved_seq(e) or math.inf, e.lot),
+    )
+    return {e.id: place for place, e in enumerate(ranked, start=1)}
+
+
+def _total_achieved_seq(entry: "EntryState") -> int | None:
+    if entry.snatch_seq is None or entry.clean_and_jerk_seq is None:
+        return None
+    return max(entry.snatch_seq, entry.clean_and_jerk_seq)
+
+
+def compute_standings(entries: Iterable["EntryState"]) -> list[dict]:
+    """Итоговые протоколы по каждой паре пол + весовая категория."""
+    categories: dict[tuple[str, str], list["EntryState"]] = defaultdict(list)
+    for entry in entries:
+        categories[(entry.gender, entry.weight_category)].append(entry)
+
+    standings = []
+
+    for gender, weight_category in sorted(categories, key=lambda k: (k[0], category_key(k[1]))):
+        items = categories[(gender, weight_category)]
+
+        snatch_rank = _rank(items, lambda e: e.best_snatch, lambda e: e.snatch_seq)
+        clean_and_jerk_rank = _rank(items, lambda e: e.best_clean_and_jerk, lambda e: e.clean_and_jerk_seq)
+        total_rank = _rank(items, lambda e: e.total, _total_achieved_seq)
+
+        # сначала занявшие места, затем остальные по жребию
+        items = sorted(items, key=lambda e: (total_rank.get(e.id, len(items) + 1), e.lot))
+
+        standings.append({
+            "gender": gender,
+            "weight_category": weight_category,
+            "athletes": [
+                {
+                    "rank": total_rank.get(e.id),
+                    "draw_entry_id": e.id,
+                    "athlete_id": e.athlete_id,
+                    "athlete_name": e.athlete_name,
+                    "group": e.group,
+                    "lot": e.lot,
+                    "snatch": e.best_snatch or None,
+                    "snatch_rank": snatch_rank.get(e.id),
+                    "clean_and_jerk": e.best_clean_and_jerk or None,
+                    "clean_and_jerk_rank": clean_and_jerk_rank.get(e.id),
+                    "total": e.total or None,
+                }
+                for e in items
+            ],
+        })
+
+    return standings
@@ -1,5 +1,12 @@
-from fastapi import FastAPI
-from app.database import init_db, Base, engine
+import time
+
+from fastapi import FastAPI, Request
+from app.config import settings
+from app.database import init_db, Base, engine, async_engine
+from app.core import query_stats
+from app.core.passwords import hasher
+from app.core.metrics import http_request_duration, http_requests_in_flight, route_template
+from app.core.broadcast import manager
 from fastapi.middleware.cors import CORSMiddleware
 from app.routers import competition_roles
 from app.routers import users
@@ -8,6 +15,7 @@ from app.routers import federations
 #Импортируем роутеры
 from app.routers import auth, competitions, applications, draw, attempts
 from app.routers import result
+from app.routers import monitoring
 
 
 # Создаём экземпляр FastAPI с указанием заголовка приложения
@@ -27,8 +35,43 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "X-DB-Query-Count", "X-DB-Time-ms"],
 )
 
+
+# Сколько запросов к БД сделал каждый HTTP-запрос и сколько они заняли
+if settings.QUERY_STATS_ENABLED:
+    query_stats.install(engine)
+    if async_engine is not None:
+        query_stats.install(async_engine.sync_engine)
+
+    @app.middleware("http")
+    async def count_queries(request: Request, call_next):
+        stats, token = query_stats.begin()
+        try:
+            response = await call_next(request)
+        finally:
+            query_stats.end(token)
+        response.headers["X-DB-Query-Count"] = str(stats.count)
+        response.headers["X-DB-Time-ms"] = f"{stats.seconds * 1000:.2f}"
+        query_stats.finish(request.method, request.url.path, stats)
+        return response
+
+
+# Латентность по шаблону маршрута (/competitions/{competition_id}, а не по каждому id)
+@app.middleware("http")
+async def track_latency(request: Request, call_next):
+    started = time.perf_counter()
+    http_requests_in_flight.inc()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        http_requests_in_flight.dec()
+        http_request_duration.observe_since(started, request.method, route_template(request.scope), status)
+
 Base.metadata.create_all(bind=engine)
 
 # Подключение роутеров
@@ -42,6 +85,8 @@ app.include_router(users.router)
 app.include_router(judging.router)
 app.include_router(federations.router)
 app.include_router(result.router)
+app.include_router(monitoring.router)
+app.include_router(monitoring.metrics_router)
 
 #app.include_router(applications.router_my)
 
@@ -54,3 +99,19 @@ app.include_router(result.router)
 def on_startup():
     init_db()
 
+
+# Шина рассылки WebSocket-событий между воркерами
+@app.on_event("startup")
+async def start_broadcast_bus():
+    await manager.start()
+
+
+@app.on_event("shutdown")
+async def stop_broadcast_bus():
+    await manager.stop()
+
+
+@app.on_event("shutdown")
+def stop_password_hasher():
+    hasher.shutdown()
+
@@ -12,4 +12,5 @@ from .application_event import ApplicationEvent
 from .notification import Notification
 from app.models.enums import ApplicationStatus, ApplicationType
 from app.models.draw import CompetitionDrawEntry
-from app.models.vote import Vote
\ No newline at end of file
+from app.models.vote import Vote
+from app.models.competition_event import CompetitionEvent, CompetitionSnapshot
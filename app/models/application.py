@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Enum, ForeignKey
+from sqlalchemy import Column, String, DateTime, Enum, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -62,4 +62,7 @@ class Application(Base):
 
     events = relationship("ApplicationEvent", cascade="all, delete-orphan")
 
-
+    __table_args__ = (
+        # заявки соревнования по типу/статусу (жеребьёвка, список, проверка дублей)
+        Index("ix_applications_competition_type_status_federation", "competition_id", "type", "status", "federation_id"),
+    )
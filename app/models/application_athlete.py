@@ -15,7 +15,7 @@ class ApplicationAthlete(Base):
     __tablename__ = "application_athletes"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    application_id = Column(UUID(as_uuid=True), ForeignKey("applications.id", ondelete="CASCADE"), nullable=False)
+    application_id = Column(UUID(as_uuid=True), ForeignKey("applications.id", ondelete="CASCADE"), nullable=False, index=True)
 
     gender = Column(Enum(Gender), nullable=False)
     last_name = Column(String, nullable=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey, Text
+from sqlalchemy import Column, String, DateTime, ForeignKey, Index, Text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 import uuid
@@ -17,3 +17,8 @@ class ApplicationEvent(Base):
     timestamp = Column(DateTime, default=datetime.utcnow)
 
     user = relationship("User")
+
+    __table_args__ = (
+        # история заявки в хронологическом порядке
+        Index("ix_application_events_application_timestamp", "application_id", "timestamp"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, text
 from sqlalchemy.dialects.postgresql import UUID
 from datetime import datetime
 import uuid
@@ -25,7 +25,7 @@ class Attempt(Base):
     lift_type = Column(String, nullable=False)   # snatch / clean_and_jerk
     weight = Column(Integer, nullable=False)
 
-    status = Column(String, default="active")      # open / closed
+    status = Column(String, default="declared")      # declared / active / closed
     result = Column(String, nullable=True)       # passed / failed
 
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -36,3 +36,16 @@ class Attempt(Base):
         cascade="all, delete-orphan"
     )
     draw_entry = relationship("CompetitionDrawEntry")
+
+    __table_args__ = (
+        # очередь и история подходов соревнования
+        Index("ix_attempts_competition_status_created", "competition_id", "status", "created_at"),
+        # текущий подход: активный всегда один, индекс крошечный
+        Index(
+            "ix_attempts_active",
+            "competition_id",
+            postgresql_where=text("status = 'active'"),
+            sqlite_where=text("status = 'active'"),
+        ),
+        Index("ix_attempts_draw_entry_id", "draw_entry_id"),
+    )
@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import Column, String, Date, Boolean
+from sqlalchemy import Column, String, Date, Boolean, DateTime, BigInteger
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -12,6 +12,9 @@ class Competition(Base):
     date = Column(Date, nullable=False)
     location = Column(String, nullable=False)
     draw_done = Column(Boolean, default=False)
+    draw_at = Column(DateTime, nullable=True)
+    # seed генератора жребия — для воспроизведения жеребьёвки при проверке
+    draw_seed = Column(BigInteger, nullable=True)
 
     # связь с CompetitionRole
     competition_roles = relationship(
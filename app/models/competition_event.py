@@ -0,0 +1,37 @@
+from sqlalchemy import Column, BigInteger, Integer, String, DateTime, ForeignKey, JSON
+from sqlalchemy.dialects.postgresql import UUID
+from datetime import datetime
+
+from app.database import Base
+
+# BIGINT-автоинкремент; в SQLite автоинкремент есть только у INTEGER PRIMARY KEY
+SeqType = BigInteger().with_variant(Integer, "sqlite")
+
+
+class CompetitionEvent(Base):
+    """Журнал событий соревнования (только добавление): из него восстанавливается живое состояние."""
+
+    __tablename__ = "competition_events"
+
+    # порядковый номер события — общий для всех соревнований, монотонно растёт
+    seq = Column(SeqType, primary_key=True, autoincrement=True)
+    competition_id = Column(UUID(as_uuid=True), ForeignKey("competitions.id"), nullable=False, index=True)
+
+    type = Column(String, nullable=False)   # attempt_declared / attempt_started / vote_cast / ...
+    payload = Column(JSON, nullable=False)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class CompetitionSnapshot(Base):
+    """Снимок живого состояния на момент события last_seq."""
+
+    __tablename__ = "competition_snapshots"
+
+    id = Column(SeqType, primary_key=True, autoincrement=True)
+    competition_id = Column(UUID(as_uuid=True), ForeignKey("competitions.id"), nullable=False, index=True)
+
+    last_seq = Column(BigInteger, nullable=False)
+    state = Column(JSON, nullable=False)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
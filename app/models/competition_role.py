@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import Column, String, ForeignKey
+from sqlalchemy import Column, String, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -17,3 +17,9 @@ class CompetitionRole(Base):
     # связи
     user = relationship("User", back_populates="competition_roles")
     competition = relationship("Competition", back_populates="competition_roles")
+
+    __table_args__ = (
+        Index("ix_competition_roles_competition_user_role", "competition_id", "user_id", "role"),
+        # роли пользователя во всех соревнованиях
+        Index("ix_competition_roles_user_id", "user_id"),
+    )
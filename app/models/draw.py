@@ -1,6 +1,6 @@
 from uuid import uuid4
 
-from sqlalchemy import Column, String, DateTime, Enum, ForeignKey, Integer
+from sqlalchemy import Column, String, DateTime, Enum, ForeignKey, Index, Integer, UniqueConstraint
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -28,3 +28,13 @@ class CompetitionDrawEntry(Base):
 
     competition = relationship("Competition")
     athlete = relationship("ApplicationAthlete")
+
+    __table_args__ = (
+        # протокол жеребьёвки читается ровно в этом порядке
+        Index(
+            "ix_draw_entries_competition_group_lot",
+            "competition_id", "gender", "weight_category", "group_letter", "lot_number",
+        ),
+        # атлет попадает в жеребьёвку соревнования один раз
+        UniqueConstraint("competition_id", "athlete_id", name="uq_draw_entry_competition_athlete"),
+    )
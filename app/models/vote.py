@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import Column, Boolean, DateTime, String, ForeignKey, UniqueConstraint
+from sqlalchemy import Column, Boolean, DateTime, String, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.dialects.postgresql import UUID as PGUUID
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
@@ -38,4 +38,6 @@ class Vote(Base):
             "role",
             name="uq_vote_per_user_attempt"
         ),
+        # подсчёт белых/красных по роли читает только индекс
+        Index("ix_votes_attempt_role_vote", "attempt_id", "role", "vote"),
     )
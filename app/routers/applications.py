@@ -1,13 +1,18 @@
 # app/routers/applications.py
+import base64
+import json
 from datetime import datetime, date
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import func, case
+from typing import Literal
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Response
+from sqlalchemy import func, case, insert, update, delete, select, or_, and_
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
 from uuid import UUID
 from sqlalchemy.orm import selectinload
 
 from app.core.application_transitions import STATUS_TRANSITIONS
 from app.database import get_db
+from app.domain.application_diff import athlete_key, diff_athletes
 from app.domain.application_transitions import ROLE_TRANSITIONS
 from app.models import (
     Application,
@@ -16,11 +21,12 @@ from app.models import (
     Competition,
     Federation,
     ApplicationType,
-    ApplicationStatus, CompetitionRole, User, Notification, application,
+    ApplicationStatus, CompetitionRole, User, Notification, application, Gender,
 )
 from app.models.application_event import ApplicationEvent
 from app.schemas import application as schemas
 from app.core.deps import get_current_user, require_competition_role, can_user_transition
+from app.core.versioning import competition_etag, versions
 from app.schemas.application import ApplicationListItemOut, ApplicationStatusUpdate
 
 router = APIRouter(
@@ -51,15 +57,80 @@ def get_or_create_federation(db: Session, name: str) -> Federation:
         return fed
     fed = Federation(name=name)
     db.add(fed)
-    db.commit()
-    db.refresh(fed)
+    # без commit: федерация сохраняется в одной транзакции с заявкой
+    db.flush()
     return fed
 
+
+def athlete_row(application_id: UUID, a) -> dict:
+    return {
+        "application_id": application_id,
+        "last_name": a.last_name,
+        "first_name": a.first_name,
+        "middle_name": a.middle_name,
+        "gender": a.gender,
+        "birth_date": a.birth_date,
+        "weight_category": a.weight_category,
+        "entry_total": a.entry_total,
+        "is_main": a.is_main,
+    }
+
+
+def bulk_insert_athletes(db: Session, application_id: UUID, athletes) -> list[ApplicationAthlete]:
+    """Все спортсмены заявки одним INSERT ... RETURNING (executemany)."""
+    if not athletes:
+        return []
+    return list(
+        db.scalars(
+            insert(ApplicationAthlete).returning(ApplicationAthlete),
+            [athlete_row(application_id, a) for a in athletes],
+        )
+    )
+
+
+def bulk_insert_staff(db: Session, application_id: UUID, staff) -> list[ApplicationStaff]:
+    if not staff:
+        return []
+    return list(
+        db.scalars(
+            insert(ApplicationStaff).returning(ApplicationStaff),
+            [
+                {
+                    "application_id": application_id,
+                    "full_name": s.full_name,
+                    "role": s.role,
+                    "contact_info": s.contact_info,
+                }
+                for s in staff
+            ],
+        )
+    )
+
+
+def save_application(db: Session, application: Application, app_in: schemas.ApplicationCreate) -> None:
+    """
+    Заявка, спортсмены и staff — в одной транзакции:
+    при ошибке не остаётся заявки без части состава.
+    """
+    db.add(application)
+    db.flush()
+
+    athletes = bulk_insert_athletes(db, application.id, app_in.athletes)
+    staff = bulk_insert_staff(db, application.id, getattr(app_in, "staff", []) or [])
+
+    db.commit()
+
+    # связи уже известны — без повторной загрузки заявки из БД
+    set_committed_value(application, "athletes", athletes)
+    set_committed_value(application, "staff", staff)
+    set_committed_value(application, "events", [])
+
 # Создание предварительной заявки
 @router.post("/preliminary", response_model=schemas.ApplicationOut)
 def create_preliminary_application(
     competition_id: UUID,
     app_in: schemas.ApplicationCreate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     user=Depends(get_current_user),
 ):
@@ -96,37 +167,9 @@ def create_preliminary_application(
         status=ApplicationStatus.submitted,
     )
 
-    db.add(application)
-    db.commit()
-    db.refresh(application)
-
-    # Добавляем спортсменов
-    for a in app_in.athletes:
-        athlete = ApplicationAthlete(
-            application_id=application.id,
-            last_name=a.last_name,
-            first_name=a.first_name,
-            middle_name=a.middle_name,
-            gender=a.gender,
-            birth_date=a.birth_date,
-            weight_category=a.weight_category,
-            entry_total=a.entry_total,
-            is_main=a.is_main,
-        )
-        db.add(athlete)
-
-    # Добавляем staff, если есть
-    for s in getattr(app_in, "staff", []) or []:
-        staff_row = ApplicationStaff(
-            application_id=application.id,
-            full_name=s.full_name,
-            role=s.role,
-            contact_info=s.contact_info,
-        )
-        db.add(staff_row)
-
-    db.commit()
-    db.refresh(application)
+    # Заявка вместе со спортсменами и staff
+    save_application(db, application, app_in)
+    versions.bump(competition_id, background_tasks=background_tasks)
 
     # Подготовим дополнительные поля для удобства фронта
     # (pydantic with orm_mode прочитает их)
@@ -140,6 +183,7 @@ def create_preliminary_application(
 def create_final_application(
     competition_id: UUID,
     app_in: schemas.ApplicationCreate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     user=Depends(get_current_user),
 ):
@@ -174,35 +218,8 @@ def create_final_application(
         status=ApplicationStatus.final_submitted,
     )
 
-    db.add(application)
-    db.commit()
-    db.refresh(application)
-
-    for a in app_in.athletes:
-        athlete = ApplicationAthlete(
-            application_id=application.id,
-            last_name=a.last_name,
-            first_name=a.first_name,
-            middle_name=a.middle_name,
-            gender=a.gender,
-            birth_date=a.birth_date,
-            weight_category=a.weight_category,
-            entry_total=a.entry_total,
-            is_main=a.is_main,
-        )
-        db.add(athlete)
-
-    for s in getattr(app_in, "staff", []) or []:
-        staff_row = ApplicationStaff(
-            application_id=application.id,
-            full_name=s.full_name,
-            role=s.role,
-            contact_info=s.contact_info,
-        )
-        db.add(staff_row)
-
-    db.commit()
-    db.refresh(application)
+    save_application(db, application, app_in)
+    versions.bump(competition_id, background_tasks=background_tasks)
 
     setattr(application, "federation_name", federation.name)
     setattr(application, "submission_date", application.submitted_at)
@@ -258,53 +275,121 @@ def get_my_application(
 
 
 
+# Сортировки списка заявок: имя параметра -> колонка (вторичный ключ — id)
+APPLICATION_SORTS = {
+    "created_at": Application.created_at,
+    "federation_name": Federation.name,
+}
+
+
+def encode_cursor(value, application_id) -> str:
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([value, str(application_id)]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor: str, sort: str) -> tuple:
+    try:
+        value, application_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if sort == "created_at":
+            value = datetime.fromisoformat(value)
+        return value, UUID(application_id)
+    except (ValueError, TypeError):
+        raise HTTPException(400, "Некорректный курсор")
+
+
 @router.get("", response_model=list[schemas.ApplicationListItemOut])
 def list_applications(
     competition_id: UUID,
+    response: Response,
     type: ApplicationType | None = None,
     status: ApplicationStatus | None = None,
     federation_id: UUID | None = None,
+    sort: Literal["created_at", "federation_name"] = "created_at",
+    order: Literal["asc", "desc"] = "desc",
+    limit: int | None = Query(None, ge=1, le=500),
+    cursor: str | None = None,
     db: Session = Depends(get_db),
     _user = Depends(
         require_competition_role(
             ("secretary", "organizer", "super_admin"),
         )
     ),
+    # после проверки прав: без токена 304 не отдаём
+    _etag = Depends(competition_etag),
 ):
-    q = db.query(Application).filter(
-        Application.competition_id == competition_id
+    """
+    Список заявок одним запросом: счётчики мужчин/женщин считаются
+    в GROUP BY, название федерации — через join.
+    С limit — постраничная выдача по курсору: следующий курсор
+    возвращается в заголовке X-Next-Cursor.
+    """
+    sort_column = APPLICATION_SORTS[sort]
+
+    q = (
+        select(
+            Application.id,
+            Application.type,
+            Application.status,
+            Application.federation_id,
+            Federation.name.label("federation_name"),
+            Application.submitted_at,
+            Application.submitted_by,
+            Application.created_at,
+            func.count(case((ApplicationAthlete.gender == Gender.male, 1))).label("male_count"),
+            func.count(case((ApplicationAthlete.gender == Gender.female, 1))).label("female_count"),
+        )
+        .join(Federation, Application.federation_id == Federation.id)
+        .outerjoin(ApplicationAthlete, ApplicationAthlete.application_id == Application.id)
+        .where(Application.competition_id == competition_id)
+        .group_by(Application.id, Federation.name)
     )
 
     if type:
-        q = q.filter(Application.type == type)
+        q = q.where(Application.type == type)
     if status:
-        q = q.filter(Application.status == status)
+        q = q.where(Application.status == status)
     if federation_id:
-        q = q.filter(Application.federation_id == federation_id)
-
-    applications = q.order_by(Application.created_at.desc()).all()
-
-    result = []
-
-    for app in applications:
-        male_count = sum(1 for a in app.athletes if a.gender == "male")
-        female_count = sum(1 for a in app.athletes if a.gender == "female")
-
-        result.append(
-            schemas.ApplicationListItemOut(
-                id=app.id,
-                type=app.type,
-                status=app.status,
-                federation_id=app.federation_id,
-                federation_name=app.federation.name if app.federation else None,
-                submission_date=app.submitted_at,
-                submitted_by=app.submitted_by,
-                male_count=male_count,
-                female_count=female_count,
-            )
+        q = q.where(Application.federation_id == federation_id)
+
+    if cursor:
+        value, after_id = decode_cursor(cursor, sort)
+        if order == "desc":
+            q = q.where(or_(sort_column < value, and_(sort_column == value, Application.id < after_id)))
+        else:
+            q = q.where(or_(sort_column > value, and_(sort_column == value, Application.id > after_id)))
+
+    if order == "desc":
+        q = q.order_by(sort_column.desc(), Application.id.desc())
+    else:
+        q = q.order_by(sort_column.asc(), Application.id.asc())
+
+    if limit:
+        # одна лишняя строка — признак следующей страницы
+        q = q.limit(limit + 1)
+
+    rows = db.execute(q).all()
+
+    if limit and len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(getattr(last, sort), last.id)
+
+    return [
+        schemas.ApplicationListItemOut(
+            id=row.id,
+            type=row.type,
+            status=row.status,
+            federation_id=row.federation_id,
+            federation_name=row.federation_name,
+            submission_date=row.submitted_at,
+            submitted_by=row.submitted_by,
+            male_count=row.male_count,
+            female_count=row.female_count,
         )
-
-    return result
+        for row in rows
+    ]
 
 
 @router.get("/admin/{application_id}", response_model=schemas.ApplicationOut)
@@ -370,6 +455,7 @@ def update_application(
     competition_id: UUID,
     application_id: UUID,
     app_in: schemas.ApplicationUpdate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     user = Depends(get_current_user),
 ):
@@ -397,15 +483,8 @@ def update_application(
         if app_in.type != "final":
             raise HTTPException(400, "Можно редактировать только окончательную заявку")
 
-        old_ids = {
-            (a.last_name, a.first_name, a.middle_name, a.birth_date)
-            for a in application.athletes
-        }
-
-        new_ids = {
-            (a.last_name, a.first_name, a.middle_name, a.birth_date)
-            for a in app_in.athletes
-        }
+        old_ids = {athlete_key(a) for a in application.athletes}
+        new_ids = {athlete_key(a) for a in app_in.athletes}
 
         if old_ids != new_ids:
             raise HTTPException(400, "Нельзя менять состав атлетов после дедлайна")
@@ -413,24 +492,13 @@ def update_application(
     # обновляем тип
     application.type = app_in.type
 
-    # пересоздаём спортсменов
-    db.query(ApplicationAthlete).filter_by(
-        application_id=application.id
-    ).delete()
-
-    for a in app_in.athletes:
-        ath = ApplicationAthlete(
-            application_id=application.id,
-            last_name=a.last_name,
-            first_name=a.first_name,
-            middle_name=a.middle_name,
-            gender=a.gender,
-            birth_date=a.birth_date,
-            weight_category=a.weight_category,
-            entry_total=a.entry_total,
-            is_main=a.is_main,
-        )
-        db.add(ath)
+    # применяем только разницу: id оставшихся спортсменов не меняются
+    diff = diff_athletes(application.athletes, app_in.athletes)
+    if diff.deletes:
+        db.execute(delete(ApplicationAthlete).where(ApplicationAthlete.id.in_(diff.deletes)))
+    if diff.updates:
+        db.execute(update(ApplicationAthlete), diff.updates)
+    bulk_insert_athletes(db, application.id, diff.inserts)
 
     if application.status == ApplicationStatus.needs_correction:
         application.status = ApplicationStatus.submitted
@@ -456,6 +524,7 @@ def update_application(
         db.add(event)
 
     db.commit()
+    versions.bump(competition_id, background_tasks=background_tasks)
     db.refresh(application)
 
     setattr(application, "federation_name",
@@ -471,6 +540,7 @@ def transition_application(
     competition_id: UUID,
     application_id: UUID,
     payload: ApplicationStatusUpdate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     user = Depends(get_current_user),
 ):
@@ -538,6 +608,7 @@ def transition_application(
 
     db.add(event)
     db.commit()
+    versions.bump(competition_id, background_tasks=background_tasks)
 
     db.refresh(application)
 
@@ -547,7 +618,7 @@ def transition_application(
 
 # Удаление заявки
 @router.delete("/{application_id}")
-def delete_application(competition_id: UUID, application_id: UUID, db: Session = Depends(get_db), user=Depends(get_current_user)):
+def delete_application(competition_id: UUID, application_id: UUID, background_tasks: BackgroundTasks, db: Session = Depends(get_db), user=Depends(get_current_user)):
     app = db.query(Application).filter_by(id=application_id, competition_id=competition_id).first()
     if not app:
         raise HTTPException(404, "Заявка не найдена")
@@ -572,6 +643,7 @@ def delete_application(competition_id: UUID, application_id: UUID, db: Session =
     db.query(ApplicationStaff).filter_by(application_id=app.id).delete()
     db.delete(app)
     db.commit()
+    versions.bump(competition_id, background_tasks=background_tasks)
 
     return {"status": "deleted"}
 
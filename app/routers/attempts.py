@@ -1,36 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID
 from datetime import date
 
 from app import models, schemas
-from app.database import get_db
-from app.core.security import get_current_user
+from app.database import get_async_db
+from app.core.broadcast import manager
+from app.core.deps import CompetitionAccess, get_competition_access
+from app.core.versioning import competition_etag, versions
+from app.domain import event_log
+from app.domain.live_state import attempt_declared_event, live_states
 
 router = APIRouter(prefix="/attempts", tags=["Attempts"])
 
 
-@router.post("/", response_model=schemas.attempt.AttemptOut)
-def create_attempt(
-    data: schemas.attempt.AttemptCreate,
-    db: Session = Depends(get_db),
-    user=Depends(get_current_user),
-):
-    # 1. Проверка роли секретаря
-    role = (
-        db.query(models.competition_role.CompetitionRole)
-        .filter_by(
-            competition_id=data.competition_id,
-            user_id=user.id,
-            role="secretary",
-        )
-        .first()
-    )
-    if not role:
-        raise HTTPException(403, "Недостаточно прав")
-
-    # 2. Проверка соревнования и даты
-    competition = db.query(models.Competition).get(data.competition_id)
+async def check_competition_day(db: AsyncSession, competition_id: UUID) -> None:
+    competition = await db.get(models.Competition, competition_id)
     if not competition:
         raise HTTPException(404, "Соревнование не найдено")
 
@@ -39,15 +25,30 @@ def create_attempt(
             400, "Попытки можно создавать только в день соревнования"
         )
 
+
+@router.post("/", response_model=schemas.attempt.AttemptOut)
+async def create_attempt(
+    data: schemas.attempt.AttemptCreate,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db),
+    access: CompetitionAccess = Depends(get_competition_access),
+):
+    # 1. Проверка роли секретаря
+    await access.require(data.competition_id, "secretary")
+
+    # 2. Проверка соревнования и даты
+    await check_competition_day(db, data.competition_id)
+
     # 3. Проверка записи жеребьёвки
     draw_entry = (
-        db.query(models.CompetitionDrawEntry)
-        .filter_by(
-            id=data.draw_entry_id,
-            competition_id=data.competition_id,
+        await db.execute(
+            select(models.CompetitionDrawEntry.id)
+            .where(
+                models.CompetitionDrawEntry.id == data.draw_entry_id,
+                models.CompetitionDrawEntry.competition_id == data.competition_id,
+            )
         )
-        .first()
-    )
+    ).first()
     if not draw_entry:
         raise HTTPException(404, "Участник жеребьёвки не найден")
 
@@ -57,46 +58,157 @@ def create_attempt(
         draw_entry_id=data.draw_entry_id,
         weight=data.weight,
         lift_type=data.lift_type,
+        status="declared",
     )
 
     db.add(attempt)
-    db.commit()
-    db.refresh(attempt)
+    await db.flush()
+
+    # событие пишется в журнал в той же транзакции
+    event = attempt_declared_event(attempt)
+    await event_log.append(db, data.competition_id, [event])
+
+    await db.commit()
+    await db.refresh(attempt)
+
+    live_states.publish(data.competition_id, event, background_tasks)
+    versions.bump(data.competition_id, background_tasks=background_tasks)
+
+    state = await live_states.get(db, data.competition_id)
+    background_tasks.add_task(manager.broadcast, str(data.competition_id), state.lift_order_message())
 
     return attempt
 
 
+@router.post("/batch", response_model=schemas.attempt.AttemptBatchOut)
+async def declare_attempts(
+    data: schemas.attempt.AttemptBatchIn,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db),
+    access: CompetitionAccess = Depends(get_competition_access),
+):
+    """
+    Заявка весов для целой группы и изменения весов — одним запросом
+    и одной транзакцией: либо применяется всё, либо ничего.
+    """
+    await access.require(data.competition_id, "secretary")
+    await check_competition_day(db, data.competition_id)
+
+    # Участники жеребьёвки — одним запросом на весь пакет
+    lifts = [(d.draw_entry_id, d.lift_type) for d in data.declarations]
+    if len(set(lifts)) != len(lifts):
+        raise HTTPException(400, "Упражнение участника заявлено в пакете несколько раз")
+
+    entry_ids = {d.draw_entry_id for d in data.declarations}
+
+    if entry_ids:
+        found = set(
+            (
+                await db.execute(
+                    select(models.CompetitionDrawEntry.id)
+                    .where(
+                        models.CompetitionDrawEntry.id.in_(entry_ids),
+                        models.CompetitionDrawEntry.competition_id == data.competition_id,
+                    )
+                )
+            ).scalars().all()
+        )
+        if found != entry_ids:
+            raise HTTPException(404, "Участник жеребьёвки не найден")
+
+    # Изменяемые попытки — тоже одним запросом, с блокировкой от одновременного старта
+    changes = {c.attempt_id: c.weight for c in data.weight_changes}
+    changed = []
+    if changes:
+        changed = (
+            await db.execute(
+                select(models.Attempt)
+                .where(
+                    models.Attempt.id.in_(changes),
+                    models.Attempt.competition_id == data.competition_id,
+                )
+                .with_for_update()
+            )
+        ).scalars().all()
+        if len(changed) != len(changes):
+            raise HTTPException(404, "Попытка не найдена")
+        if any(a.status != "declared" for a in changed):
+            raise HTTPException(400, "Вес можно изменить только у ещё не вызванной попытки")
+        for attempt in changed:
+            attempt.weight = changes[attempt.id]
+
+    declared = []
+    if data.declarations:
+        declared = (
+            await db.execute(
+                insert(models.Attempt).returning(models.Attempt),
+                [
+                    {
+                        "competition_id": data.competition_id,
+                        "draw_entry_id": d.draw_entry_id,
+                        "weight": d.weight,
+                        "lift_type": d.lift_type.value,
+                        "status": "declared",
+                    }
+                    for d in data.declarations
+                ],
+            )
+        ).scalars().all()
+
+    events = [attempt_declared_event(a) for a in declared] + [
+        {"type": "attempt_weight_changed", "attempt_id": str(a.id), "weight": a.weight}
+        for a in changed
+    ]
+    if events:
+        await event_log.append(db, data.competition_id, events)
+
+    await db.commit()
+
+    if events:
+        live_states.publish_all(data.competition_id, events, background_tasks)
+        versions.bump(data.competition_id, background_tasks=background_tasks)
+
+        state = await live_states.get(db, data.competition_id)
+        background_tasks.add_task(manager.broadcast, str(data.competition_id), state.lift_order_message())
+
+    return {"declared": declared, "changed": changed}
+
+
 @router.get(
     "/draw_entries/{competition_id}",
-    response_model=list[schemas.attempt.DrawEntryOut]
+    response_model=list[schemas.attempt.DrawEntryOut],
+    dependencies=[Depends(competition_etag)],
 )
-def get_draw_entries(
+async def get_draw_entries(
     competition_id: UUID,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     return (
-        db.query(models.CompetitionDrawEntry)
-        .filter(models.CompetitionDrawEntry.competition_id == competition_id)
-        .order_by(
-            models.CompetitionDrawEntry.group_letter,
-            models.CompetitionDrawEntry.weight_category,
-            models.CompetitionDrawEntry.lot_number,
+        await db.execute(
+            select(models.CompetitionDrawEntry)
+            .where(models.CompetitionDrawEntry.competition_id == competition_id)
+            .order_by(
+                models.CompetitionDrawEntry.group_letter,
+                models.CompetitionDrawEntry.weight_category,
+                models.CompetitionDrawEntry.lot_number,
+            )
         )
-        .all()
-    )
+    ).scalars().all()
 
 
 
 @router.get(
     "/competition/{competition_id}",
     response_model=list[schemas.attempt.AttemptOut],
+    dependencies=[Depends(competition_etag)],
 )
-def list_attempts(
+async def list_attempts(
     competition_id: UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     return (
-        db.query(models.Attempt)
-        .filter(models.Attempt.competition_id == competition_id)
-        .all()
-    )
+        await db.execute(
+            select(models.Attempt)
+            .where(models.Attempt.competition_id == competition_id)
+        )
+    ).scalars().all()
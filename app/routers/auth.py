@@ -1,58 +1,76 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from passlib.context import CryptContext
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import schemas, models
-from app.database import get_db
+from app.database import get_async_db
+from app.core.passwords import hasher
 from app.core.security import create_access_token
 
 router = APIRouter()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
-# Функция для хэширования пароля
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
-
-
-# Функция для проверки пароля
-def verify_password(plain: str, hashed: str) -> bool:
-    return pwd_context.verify(plain, hashed)
+def email_taken(session, email: str) -> bool:
+    # соединение не держим, пока считается bcrypt (см. find_user)
+    taken = session.scalar(select(models.user.User.id).where(models.user.User.email == email)) is not None
+    session.commit()
+    return taken
 
 
 # Регистрация пользователя
 @router.post("/register", response_model=schemas.user.UserOut, status_code=201)
-def register(user: schemas.user.UserCreate, db: Session = Depends(get_db)):
-    if db.query(models.user.User).filter(models.user.User.email == user.email).first():
+async def register(user: schemas.user.UserCreate, db: AsyncSession = Depends(get_async_db)):
+    if await db.run_sync(email_taken, user.email):
         raise HTTPException(status_code=400, detail="Email already registered")
 
     db_user = models.user.User(
         email=user.email,
-        hashed_password=hash_password(user.password),
+        # bcrypt — в отдельном пуле, event loop и общий пул потоков свободны
+        hashed_password=await hasher.hash(user.password),
         full_name=user.full_name,
         global_role=user.role or "athlete",  # сохраняем в global_role
     )
 
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    return db_user
+
+
+def find_user(session, email_or_username: str) -> models.user.User | None:
+    """
+    Пользователь по email или имени; транзакция закрывается сразу —
+    соединение возвращается в пул до того, как начнётся bcrypt.
+    Одним вызовом run_sync: поток, держащий соединение, сам его и отпускает.
+    """
+    db_user = session.execute(
+        select(models.user.User)
+        .where(
+            (models.user.User.email == email_or_username) |
+            (models.user.User.full_name == email_or_username)
+        )
+        .limit(1)
+    ).scalar_one_or_none()
+    session.commit()
     return db_user
 
 
 # Вход
 @router.post("/login", response_model=schemas.user.Token)
-def login(user: schemas.user.UserLogin, db: Session = Depends(get_db)):
-    db_user = (
-        db.query(models.user.User)
-        .filter(
-            (models.user.User.email == user.email_or_username) |
-            (models.user.User.full_name == user.email_or_username)
-        )
-        .first()
-    )
-    if not db_user or not verify_password(user.password, db_user.hashed_password):
+async def login(user: schemas.user.UserLogin, db: AsyncSession = Depends(get_async_db)):
+    db_user = await db.run_sync(find_user, user.email_or_username)
+    if not db_user:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid credentials")
 
+    valid, new_hash = await hasher.verify(user.password, db_user.hashed_password)
+    if not valid:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid credentials")
+
+    # изменилась стоимость bcrypt — пароль перехэшируется прозрачно, пока он у нас в руках
+    if new_hash:
+        db_user.hashed_password = new_hash
+        await db.commit()
+
     token = create_access_token({"sub": str(db_user.id), "role": db_user.global_role})
     return {
         "access_token": token,
@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from sqlalchemy.orm import Session
 from uuid import UUID
 from app import models, schemas
 from app.database import get_db
 from app.core.deps import require_superadmin_or_own_competition
+from app.core.roles import roles_changed
+from app.core.versioning import competition_etag
 from app.core.security import get_current_user
 
 
@@ -17,6 +19,7 @@ router = APIRouter(
 def assign_role(
     competition_id: UUID,
     role_in: schemas.competition_role.CompetitionRoleCreate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     user=Depends(require_superadmin_or_own_competition(["organizer"]))
 ):
@@ -29,6 +32,8 @@ def assign_role(
     db.add(new_role)
     db.commit()
     db.refresh(new_role)
+
+    roles_changed(competition_id, new_role.user_id, new_role.role, "assigned", background_tasks)
     return new_role
 
 
@@ -37,6 +42,7 @@ def assign_role(
 def delete_role(
     competition_id: str,
     role_id: str,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     user=Depends(require_superadmin_or_own_competition(["organizer"]))
 ):
@@ -61,12 +67,18 @@ def delete_role(
 
     db.delete(role)
     db.commit()
+
+    roles_changed(competition_id, role.user_id, role.role, "removed", background_tasks)
     return None
 
 
 
 # ---- Получить роли по соревнованию ----
-@router.get("/by_competition/{competition_id}", response_model=list[schemas.competition_role.CompetitionRoleOut])
+@router.get(
+    "/by_competition/{competition_id}",
+    response_model=list[schemas.competition_role.CompetitionRoleOut],
+    dependencies=[Depends(competition_etag)],
+)
 def get_roles_for_competition(
     competition_id: UUID,
     db: Session = Depends(get_db)
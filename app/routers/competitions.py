@@ -1,11 +1,13 @@
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from uuid import UUID
 
 from app import models, schemas
 from app.database import get_db
 from app.core.deps import get_current_user
+from app.core.roles import roles_changed
+from app.core.versioning import COMPETITIONS_KEY, competition_etag, competitions_etag, versions
 from app.models import Competition
 from app.schemas.competition import CompetitionOut
 
@@ -18,6 +20,7 @@ router = APIRouter()
 @router.post("/", response_model=schemas.competition.CompetitionOut)
 def create_competition(
     comp: schemas.competition.CompetitionCreate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user=Depends(get_current_user),
 ):
@@ -36,6 +39,8 @@ def create_competition(
     db.commit()
     db.refresh(db_comp)
 
+    versions.bump(COMPETITIONS_KEY, background_tasks=background_tasks)
+
     if current_user.global_role == "organizer":
         organizer_role = models.competition_role.CompetitionRole(
             competition_id=db_comp.id,
@@ -45,13 +50,19 @@ def create_competition(
         db.add(organizer_role)
         db.commit()
 
+        roles_changed(db_comp.id, current_user.id, "organizer", "assigned", background_tasks)
+
     return db_comp
 
 
 # ============================================================
 # 🟦 ПОЛУЧИТЬ ВСЕ СОРЕВНОВАНИЯ
 # ============================================================
-@router.get("/", response_model=list[schemas.competition.CompetitionOut])
+@router.get(
+    "/",
+    response_model=list[schemas.competition.CompetitionOut],
+    dependencies=[Depends(competitions_etag)],
+)
 def get_competitions(db: Session = Depends(get_db)):
     return db.query(models.competition.Competition).all()
 
@@ -59,7 +70,7 @@ def get_competitions(db: Session = Depends(get_db)):
 # ============================================================
 # 🟩 ПОЛУЧИТЬ ОДНО СОРЕВНОВАНИЕ (важно! используется фронтом)
 # ============================================================
-@router.get("/{competition_id}", response_model=CompetitionOut)
+@router.get("/{competition_id}", response_model=CompetitionOut, dependencies=[Depends(competition_etag)])
 def get_competition(competition_id: UUID, db: Session = Depends(get_db)):
     comp = db.query(Competition).filter_by(id=competition_id).first()
     if not comp:
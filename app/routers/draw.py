@@ -1,34 +1,26 @@
-import random
-from collections import defaultdict
 from datetime import datetime, date
-from fastapi import Depends, HTTPException, APIRouter
+from fastapi import BackgroundTasks, Depends, HTTPException, APIRouter, Header, Response
 from sqlalchemy.orm import Session
 from uuid import UUID
 
 from app import schemas
 from app.database import get_db
-from app.models import (
-    Application,
-    ApplicationAthlete,
-    Competition,
-    ApplicationStatus
-)
+from app.models import Competition
 
 from app.core.deps import get_current_user
-from app.models.draw import CompetitionDrawEntry
+from app.domain import draw_engine
+from app.core.versioning import COMPETITIONS_KEY, versions, etag_matches
+from app.domain.draw_sheet import draw_sheets
+from app.domain.live_state import live_states
 
 
 router = APIRouter()
 
 
-def chunk(lst, size):
-    for i in range(0, len(lst), size):
-        yield lst[i:i + size]
-
-
 @router.post("/{competition_id}/draw")
 def run_draw(
     competition_id: UUID,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     user=Depends(get_current_user),
 ):
@@ -43,117 +35,47 @@ def run_draw(
         raise HTTPException(400, "Жеребьёвка уже проведена")
 
     # Берём всех атлетов из verified-заявок
-    athletes = (
-        db.query(ApplicationAthlete)
-        .join(Application)
-        .filter(
-            Application.competition_id == competition_id,
-            Application.status == ApplicationStatus.verified,
-        )
-        .all()
-    )
+    athletes = draw_engine.load_athletes(db, competition_id)
 
     if not athletes:
         raise HTTPException(400, "Нет атлетов для жеребьёвки")
 
-    # Группируем по полу + категории
-    buckets: dict[tuple[str, str], list[ApplicationAthlete]] = defaultdict(list)
-
-    for a in athletes:
-        key = (a.gender, a.weight_category)
-        buckets[key].append(a)
-
-    MAX_GROUP_SIZE = 12
-
-    for (gender, cat), group_athletes in buckets.items():
-        # сортировка по заявленному тоталу
-        group_athletes.sort(key=lambda x: x.entry_total or 0, reverse=True)
-
-        groups = list(chunk(group_athletes, MAX_GROUP_SIZE))
-
-        for idx, group in enumerate(groups):
-            letter = chr(ord("A") + idx)
-
-            random.shuffle(group)
-
-            for lot, a in enumerate(group, start=1):
-                entry = CompetitionDrawEntry(
-                    competition_id=competition_id,
-                    athlete_id=a.id,
-                    gender=gender,
-                    weight_category=cat,
-                    group_letter=letter,
-                    lot_number=lot,
-                    entry_total=a.entry_total,
-                )
-                db.add(entry)
+    # seed сохраняется вместе с жеребьёвкой — её можно воспроизвести
+    seed = draw_engine.new_seed()
+    rows = draw_engine.compute_draw(competition_id, athletes, seed)
+    draw_engine.write_draw(db, rows)
 
+    comp.draw_seed = seed
     comp.draw_at = datetime.utcnow()
 
     comp.draw_done = True
     db.commit()
 
-    return {"status": "ok"}
+    # живое состояние, загруженное до жеребьёвки, не знает участников
+    live_states.invalidate(competition_id)
+    # протокол собирается один раз — дальше его читают только из кэша
+    draw_sheets.build(db, competition_id)
+    # draw_done виден и в карточке, и в списке соревнований
+    versions.bump(competition_id, COMPETITIONS_KEY, background_tasks=background_tasks)
+
+    return {"status": "ok", "seed": seed, "entries": len(rows)}
 
 
 @router.get("/{competition_id}/draw", response_model=schemas.DrawResultOut)
 def get_draw(
     competition_id: UUID,
+    if_none_match: str | None = Header(None),
     db: Session = Depends(get_db),
     user=Depends(get_current_user),
 ):
-    entries = (
-        db.query(CompetitionDrawEntry)
-        .join(ApplicationAthlete)
-        .filter(CompetitionDrawEntry.competition_id == competition_id)
-        .order_by(
-            CompetitionDrawEntry.gender,
-            CompetitionDrawEntry.weight_category,
-            CompetitionDrawEntry.group_letter,
-            CompetitionDrawEntry.lot_number,
-        )
-        .all()
-    )
-
-    if not entries:
+    # протокол неизменен после жеребьёвки — отдаём готовые байты или 304
+    sheet = draw_sheets.get(db, competition_id)
+    if sheet is None:
         raise HTTPException(404, "Жеребьёвка ещё не проведена")
 
-    groups_map: dict[tuple[str, str, str], list[CompetitionDrawEntry]] = defaultdict(list)
-
-    for e in entries:
-        key = (e.gender, e.weight_category, e.group_letter)
-        groups_map[key].append(e)
-
-    groups_out = []
-
-    for (gender, cat, letter), items in groups_map.items():
-        athletes_out = []
-
-        for e in items:
-            a = e.athlete
-            athletes_out.append(
-                schemas.DrawAthleteOut(
-                    athlete_id=a.id,
-                    last_name=a.last_name,
-                    first_name=a.first_name,
-                    gender=gender,
-                    weight_category=cat,
-                    entry_total=e.entry_total,
-                    group_letter=letter,
-                    lot_number=e.lot_number,
-                )
-            )
-
-        groups_out.append(
-            schemas.DrawGroupOut(
-                gender=gender,
-                weight_category=cat,
-                group_letter=letter,
-                athletes=athletes_out,
-            )
-        )
-
-    return schemas.DrawResultOut(
-        competition_id=competition_id,
-        groups=groups_out,
-    )
+    etag, body = sheet
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -5,13 +5,24 @@ from fastapi import (
     WebSocketDisconnect,
     HTTPException,
     BackgroundTasks,
+    Query,
 )
-from sqlalchemy.orm import Session
+from sqlalchemy import case, func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID
+import time
 
-from app.database import get_db
+from app.database import async_session, get_async_db
 from app import models
-from app.core.security import get_current_user
+from app.config import settings
+from app.core.broadcast import manager
+from app.core.deps import CompetitionAccess, get_competition_access
+from app.core.metrics import vote_to_close
+from app.core.roles import get_judges_count
+from app.core.versioning import competition_etag, versions
+from app.domain import event_log
+from app.domain.live_state import feed_message, live_states
 from app.schemas.vote import VoteIn
 
 router = APIRouter(
@@ -21,38 +32,54 @@ router = APIRouter(
 
 
 # =====================
-# WEBSOCKET MANAGER
+# WEBSOCKET ENDPOINT
 # =====================
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: dict[str, list[WebSocket]] = {}
-
-    async def connect(self, competition_id: str, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.setdefault(competition_id, []).append(websocket)
-
-    def disconnect(self, competition_id: str, websocket: WebSocket):
-        if competition_id in self.active_connections:
-            self.active_connections[competition_id].remove(websocket)
-
-    async def broadcast(self, competition_id: str, message: dict):
-        for ws in self.active_connections.get(competition_id, []):
-            await ws.send_json(message)
+async def missed_messages(competition_id: str, last_seq: int) -> list[dict]:
+    """
+    Что клиент пропустил после last_seq: из буфера в памяти, а если он
+    не покрывает промежуток (воркер перезапущен, буфер переполнен) —
+    из журнала событий. Слишком большой разрыв — команда resync.
+    """
+    missed = manager.replay(competition_id, last_seq)
+    state = live_states.states.get(competition_id)
+
+    if missed is None:
+        async with async_session() as db:
+            events = await event_log.events_after(
+                db, UUID(competition_id), last_seq, limit=settings.WS_REPLAY_LIMIT + 1
+            )
+            if len(events) > settings.WS_REPLAY_LIMIT:
+                return [{"type": "resync"}]
+            state = await live_states.get(db, competition_id)
+        missed = [m for m in (feed_message(e, state) for e in events) if m is not None]
+
+    # очередь вызова — состояние, а не поток событий: отдаём текущую
+    if state is not None:
+        missed.append(state.lift_order_message())
+    return missed
 
 
-manager = ConnectionManager()
-
-
-# =====================
-# WEBSOCKET ENDPOINT
-# =====================
 @router.websocket("/competitions/{competition_id}/ws")
-async def competition_ws(websocket: WebSocket, competition_id: UUID):
-    await manager.connect(str(competition_id), websocket)
+async def competition_ws(
+    websocket: WebSocket,
+    competition_id: UUID,
+    last_seq: int | None = None,
+    encoding: str = "json",     # json / msgpack (бинарные кадры)
+    batch: bool = False,        # пачки сообщений массивом за окно WS_BATCH_WINDOW_MS
+):
+    backlog = []
+    if last_seq is not None:
+        backlog = await missed_messages(str(competition_id), last_seq)
+
+    await manager.connect(str(competition_id), websocket, backlog, last_seq, encoding, batch)
     try:
         while True:
             await websocket.receive_text()
-    except WebSocketDisconnect:
+    except (WebSocketDisconnect, RuntimeError):
+        # RuntimeError — сокет уже закрыт менеджером как мёртвый
+        pass
+    finally:
+        # сокет мог быть уже выброшен менеджером — disconnect идемпотентен
         manager.disconnect(str(competition_id), websocket)
 
 
@@ -60,56 +87,52 @@ async def competition_ws(websocket: WebSocket, competition_id: UUID):
 # START ATTEMPT
 # =====================
 @router.post("/attempts/{attempt_id}/start")
-def start_attempt(
+async def start_attempt(
     attempt_id: UUID,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
-    user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    access: CompetitionAccess = Depends(get_competition_access),
 ):
-    role = (
-        db.query(models.competition_role.CompetitionRole)
-        .filter_by(user_id=user.id, role="secretary")
-        .first()
-    )
-    if not role:
-        raise HTTPException(403, "Недостаточно прав")
-
-    attempt = db.query(models.Attempt).get(attempt_id)
+    attempt = await db.get(models.Attempt, attempt_id)
     if not attempt:
         raise HTTPException(404, "Попытка не найдена")
 
-    attempt.status = "active"
-    db.commit()
+    # секретарь именно этого соревнования
+    await access.require(attempt.competition_id, "secretary")
+
+    if attempt.status == "closed":
+        raise HTTPException(400, "Попытка уже завершена")
+
+    # Условный UPDATE, как при закрытии в submit_vote: параллельный решающий
+    # голос мог закрыть попытку после чтения — не перезаписываем closed
+    # и не рассылаем второй attempt_started
+    started = (
+        await db.execute(
+            update(models.Attempt)
+            .where(
+                models.Attempt.id == attempt_id,
+                models.Attempt.status == "declared",
+            )
+            .values(status="active")
+            .execution_options(synchronize_session=False)
+        )
+    ).rowcount == 1
+    if not started:
+        raise HTTPException(409, "Попытка уже вызвана или завершена")
 
-    draw = attempt.draw_entry
-    athlete = draw.athlete
+    competition_id = str(attempt.competition_id)
+    event = {"type": "attempt_started", "attempt_id": str(attempt.id)}
+    await event_log.append(db, competition_id, [event])
 
-    athlete_name = " ".join(
-        filter(None, [
-            athlete.last_name,
-            athlete.first_name,
-            athlete.middle_name,
-        ])
-    )
+    await db.commit()
 
-    background_tasks.add_task(
-        manager.broadcast,
-        str(attempt.competition_id),
-        {
-            "type": "attempt_started",
-            "attempt": {
-                "id": str(attempt.id),
-                "weight": attempt.weight,
-                "lift_type": attempt.lift_type,
-                "draw_entry": {
-                    "group": draw.group_letter,
-                    "weight_category": draw.weight_category,
-                    "lot": draw.lot_number,
-                    "athlete_name": athlete_name,
-                },
-            },
-        },
-    )
+    live_states.publish(competition_id, event, background_tasks)
+    versions.bump(competition_id, background_tasks=background_tasks)
+
+    state = await live_states.get(db, competition_id)
+    background_tasks.add_task(manager.broadcast, competition_id, feed_message(event, state))
+    # вызванный подход ушёл из очереди — табло call-room обновляет порядок
+    background_tasks.add_task(manager.broadcast, competition_id, state.lift_order_message())
 
     return {"status": "started"}
 
@@ -117,45 +140,29 @@ def start_attempt(
 # =====================
 # CURRENT ATTEMPT
 # =====================
-@router.get("/competitions/{competition_id}/current_attempt")
-def get_current_attempt(
+@router.get("/competitions/{competition_id}/current_attempt", dependencies=[Depends(competition_etag)])
+async def get_current_attempt(
     competition_id: UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    attempt = (
-        db.query(models.Attempt)
-        .filter(
-            models.Attempt.competition_id == competition_id,
-            models.Attempt.status == "active",
-        )
-        .order_by(models.Attempt.created_at.desc())
-        .first()
-    )
-
-    if not attempt:
-        return None
-
-    draw = attempt.draw_entry
-    athlete = draw.athlete
+    # отдаём из живого состояния — без запросов к БД
+    return (await live_states.get(db, competition_id)).current_attempt()
 
-    athlete_name = " ".join(
-        filter(None, [
-            athlete.last_name,
-            athlete.first_name,
-            athlete.middle_name,
-        ])
-    )
 
+# =====================
+# LIFT ORDER
+# =====================
+@router.get("/competitions/{competition_id}/lift_order", dependencies=[Depends(competition_etag)])
+async def get_lift_order(
+    competition_id: UUID,
+    limit: int | None = Query(None, ge=1),
+    db: AsyncSession = Depends(get_async_db),
+):
+    # очередь вызова поддерживается в живом состоянии — без запросов к БД
+    state = await live_states.get(db, competition_id)
     return {
-        "id": str(attempt.id),
-        "weight": attempt.weight,
-        "lift_type": attempt.lift_type,
-        "draw_entry": {
-            "group": draw.group_letter,
-            "weight_category": draw.weight_category,
-            "lot": draw.lot_number,
-            "athlete_name": athlete_name,
-        },
+        "next": state.next_attempt(),
+        "order": state.lift_order(limit),
     }
 
 
@@ -163,40 +170,34 @@ def get_current_attempt(
 # SUBMIT VOTE (AUTO CLOSE)
 # =====================
 @router.post("/attempts/{attempt_id}/vote")
-def submit_vote(
+async def submit_vote(
     attempt_id: UUID,
     data: VoteIn,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
-    user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    access: CompetitionAccess = Depends(get_competition_access),
 ):
-    role = (
-        db.query(models.competition_role.CompetitionRole)
-        .filter_by(user_id=user.id, role="judge")
-        .first()
-    )
-    if not role:
-        raise HTTPException(403, "Недостаточно прав")
+    received = time.perf_counter()
+    user = access.user
 
-    attempt = db.query(models.Attempt).get(attempt_id)
+    # Всё в одной транзакции: блокируем попытку, чтобы одновременные
+    # последние голоса не закрыли её дважды (или ни разу)
+    attempt = (
+        await db.execute(
+            select(models.Attempt)
+            .where(models.Attempt.id == attempt_id)
+            .with_for_update()
+        )
+    ).scalar_one_or_none()
     if not attempt:
         raise HTTPException(404, "Попытка не найдена")
 
+    # судья именно этого соревнования
+    await access.require(attempt.competition_id, "judge")
+
     if attempt.status != "active":
         raise HTTPException(400, "Попытка неактивна")
 
-    existing_vote = (
-        db.query(models.Vote)
-        .filter_by(
-            attempt_id=attempt_id,
-            user_id=user.id,
-            role="judge",
-        )
-        .first()
-    )
-    if existing_vote:
-        raise HTTPException(409, "Вы уже голосовали")
-
     vote = models.Vote(
         attempt_id=attempt_id,
         user_id=user.id,
@@ -204,52 +205,69 @@ def submit_vote(
         vote=data.vote,
     )
     db.add(vote)
-    db.commit()
-
-    votes = (
-        db.query(models.Vote)
-        .filter_by(attempt_id=attempt_id, role="judge")
-        .all()
-    )
-
-    judges_count = (
-        db.query(models.competition_role.CompetitionRole)
-        .filter_by(
-            competition_id=attempt.competition_id,
-            role="judge",
-        )
-        .count()
-    )
+    try:
+        await db.flush()
+    except IntegrityError:
+        # uq_vote_per_user_attempt
+        await db.rollback()
+        raise HTTPException(409, "Вы уже голосовали")
 
-    if len(votes) == judges_count:
-        white = sum(v.vote is True for v in votes)
-        red = sum(v.vote is False for v in votes)
-
-        attempt.result = "passed" if white > red else "failed"
-        attempt.status = "closed"
-        db.commit()
-
-        background_tasks.add_task(
-            manager.broadcast,
-            str(attempt.competition_id),
-            {
-                "type": "attempt_closed",
-                "attempt_id": str(attempt.id),
-                "result": attempt.result,
-                "white": white,
-                "red": red,
-            },
+    total, white = (
+        await db.execute(
+            select(
+                func.count(models.Vote.id),
+                func.coalesce(func.sum(case((models.Vote.vote.is_(True), 1), else_=0)), 0),
+            )
+            .where(models.Vote.attempt_id == attempt_id, models.Vote.role == "judge")
         )
-
-    background_tasks.add_task(
-        manager.broadcast,
-        str(attempt.competition_id),
+    ).one()
+    red = total - white
+
+    closed = False
+    result = None
+    if total >= await get_judges_count(db, attempt.competition_id):
+        result = "passed" if white > red else "failed"
+
+        # Условный UPDATE: закрывает попытку ровно один запрос,
+        # даже если СУБД не поддерживает блокировку строк (SQLite)
+        closed = (
+            await db.execute(
+                update(models.Attempt)
+                .where(
+                    models.Attempt.id == attempt_id,
+                    models.Attempt.status == "active",
+                )
+                .values(status="closed", result=result)
+                .execution_options(synchronize_session=False)
+            )
+        ).rowcount == 1
+
+    competition_id = str(attempt.competition_id)
+    events = [
         {
-            "type": "vote_submitted",
+            "type": "vote_cast",
             "attempt_id": str(attempt.id),
             "user_id": str(user.id),
             "vote": data.vote,
-        },
-    )
+        }
+    ]
+    if closed:
+        events.append(
+            {"type": "attempt_closed", "attempt_id": str(attempt.id), "result": result, "white": white, "red": red}
+        )
+    await event_log.append(db, competition_id, events)
+
+    await db.commit()
+
+    live_states.publish_all(competition_id, events, background_tasks)
+    if closed:
+        versions.bump(competition_id, background_tasks=background_tasks)
+
+    # в порядке seq: vote_submitted, затем attempt_closed
+    for event in events:
+        background_tasks.add_task(manager.broadcast, competition_id, feed_message(event))
+    # фоновые задачи идут по очереди — замер после рассылки attempt_closed
+    if closed:
+        background_tasks.add_task(vote_to_close.observe_since, received)
 
     return {"status": "ok"}
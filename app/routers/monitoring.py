@@ -0,0 +1,76 @@
+# app/routers/monitoring.py
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+
+from app.core import query_stats
+from app.core.broadcast import manager
+from app.core.deps import require_global_role
+from app.core.metrics import registry, sample_lines
+from app.database import pool_stats
+
+router = APIRouter(
+    prefix="/monitoring",
+    tags=["monitoring"]
+)
+
+# /metrics — по соглашению Prometheus, без префикса
+metrics_router = APIRouter(tags=["monitoring"])
+
+
+@router.get("/db-pool")
+def get_db_pool_stats():
+    return pool_stats()
+
+
+@router.get("/queries", dependencies=[Depends(require_global_role(["super_admin"]))])
+def get_query_stats():
+    """
+    Последние запросы, в которых один и тот же SQL повторялся (подозрение на N+1).
+    Текст SQL и пути запросов — только супер-админу.
+    """
+    return list(query_stats.recent)
+
+
+def collect_websockets() -> list[str]:
+    connections = {(cid,): len(clients) for cid, clients in manager.active_connections.items()}
+    dropped = {
+        (cid,): sum(client.dropped for client in clients.values())
+        for cid, clients in manager.active_connections.items()
+    }
+    return (
+        sample_lines("ws_connections", "Open WebSocket connections per competition", "gauge", ("competition_id",), connections)
+        + sample_lines(
+            "ws_messages_dropped", "Messages dropped from send queues of open connections", "gauge",
+            ("competition_id",), dropped,
+        )
+    )
+
+
+# pool_stats() -> (имя метрики, ключ, тип)
+POOL_METRICS = (
+    ("db_pool_size", "size", "gauge"),
+    ("db_pool_checked_out", "checked_out", "gauge"),
+    ("db_pool_overflow", "overflow", "gauge"),
+    ("db_pool_checkouts_total", "checkouts", "counter"),
+    ("db_pool_timeouts_total", "timeouts", "counter"),
+    ("db_pool_wait_seconds_total", "wait_seconds_total", "counter"),
+)
+
+
+def collect_db_pool() -> list[str]:
+    stats = pool_stats()
+    lines = []
+    for name, key, kind in POOL_METRICS:
+        samples = {(engine,): item[key] for engine, item in stats.items() if key in item}
+        if samples:
+            lines += sample_lines(name, f"Connection pool {key.replace('_', ' ')}", kind, ("engine",), samples)
+    return lines
+
+
+registry.add_collector(collect_websockets)
+registry.add_collector(collect_db_pool)
+
+
+@metrics_router.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID
 
-from app.database import get_db
-from app import models
+from app.core.versioning import competition_etag
+from app.database import get_async_db
+from app.domain.live_state import live_states
 
 router = APIRouter(
     prefix="/competitions",
@@ -11,59 +12,28 @@ router = APIRouter(
 )
 
 
-@router.get("/{competition_id}/results")
-def get_competition_results(
+@router.get("/{competition_id}/results", dependencies=[Depends(competition_etag)])
+async def get_competition_results(
     competition_id: UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Итоговая таблица результатов соревнования.
     Берём ТОЛЬКО закрытые попытки.
     """
 
-    attempts = (
-        db.query(models.Attempt)
-        .filter(
-            models.Attempt.competition_id == competition_id,
-            models.Attempt.status == "closed",
-        )
-        .order_by(
-            models.Attempt.created_at
-        )
-        .all()
-    )
+    # закрытые попытки уже собраны в живом состоянии в порядке created_at
+    return (await live_states.get(db, competition_id)).results()
 
-    if not attempts:
-        return []
 
-    results = []
-
-    for attempt in attempts:
-        draw = attempt.draw_entry
-        athlete = draw.athlete
-
-        athlete_name = " ".join(
-            filter(
-                None,
-                [
-                    athlete.last_name,
-                    athlete.first_name,
-                    athlete.middle_name,
-                ],
-            )
-        )
-
-        results.append({
-            "attempt_id": str(attempt.id),
-            "lift_type": attempt.lift_type,
-            "weight": attempt.weight,
-            "result": attempt.result,  # passed / failed
-            "athlete": {
-                "name": athlete_name,
-                "group": draw.group_letter,
-                "weight_category": draw.weight_category,
-                "lot": draw.lot_number,
-            },
-        })
+@router.get("/{competition_id}/standings", dependencies=[Depends(competition_etag)])
+async def get_competition_standings(
+    competition_id: UUID,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Протоколы по полу и весовой категории: лучший рывок, лучший толчок,
+    сумма и места по каждому упражнению.
+    """
 
-    return results
+    return (await live_states.get(db, competition_id)).standings()
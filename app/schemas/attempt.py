@@ -27,6 +27,24 @@ class AttemptCreate(BaseModel):
     lift_type: LiftType
 
 
+class AttemptDeclaration(BaseModel):
+    draw_entry_id: UUID
+    weight: int
+    lift_type: LiftType
+
+
+class AttemptWeightChange(BaseModel):
+    attempt_id: UUID
+    weight: int
+
+
+class AttemptBatchIn(BaseModel):
+    competition_id: UUID
+    # открывающие веса группы и/или изменения уже заявленных весов
+    declarations: list[AttemptDeclaration] = []
+    weight_changes: list[AttemptWeightChange] = []
+
+
 class AttemptOut(BaseModel):
     id: UUID
     draw_entry_id: UUID
@@ -39,3 +57,8 @@ class AttemptOut(BaseModel):
     class Config:
         from_attributes = True
 
+
+
+class AttemptBatchOut(BaseModel):
+    declared: list[AttemptOut]
+    changed: list[AttemptOut]
@@ -0,0 +1,128 @@
+"""
+Жеребьёвка большого турнира: 10 000 атлетов, все весовые категории.
+
+    python benchmarks/bench_draw.py [--athletes 10000] [--repeat 5]
+
+По умолчанию — временная SQLite; для Postgres задайте DATABASE_URL
+(таблицы будут созданы; соревнование бенчмарка удаляется в конце).
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+TMP_DB = os.path.join(tempfile.mkdtemp(), "bench_draw.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{TMP_DB}")
+
+from sqlalchemy import delete, insert, select  # noqa: E402
+
+from app.database import Base, SessionLocal, engine  # noqa: E402
+from app.domain import draw_engine  # noqa: E402
+from app.models import (  # noqa: E402
+    Application, ApplicationAthlete, Competition, Federation, User,
+)
+from app.models.draw import CompetitionDrawEntry  # noqa: E402
+
+CATEGORIES = {
+    "male": ["60", "65", "71", "79", "88", "94", "110", "+110"],
+    "female": ["48", "53", "58", "63", "69", "77", "86", "+86"],
+}
+
+
+def seed(db, athletes: int) -> uuid.UUID:
+    user = User(email=f"bench-{uuid.uuid4().hex}@example.com", hashed_password="x", full_name="bench")
+    competition = Competition(name="bench", date=date.today(), location="bench")
+    db.add_all([user, competition])
+    db.flush()
+
+    # ~20 атлетов на федерацию, как в открытом турнире
+    applications = []
+    for i in range(max(athletes // 20, 1)):
+        federation = Federation(name=f"bench-{uuid.uuid4().hex}")
+        db.add(federation)
+        db.flush()
+        applications.append({
+            "id": uuid.uuid4(),
+            "competition_id": competition.id,
+            "federation_id": federation.id,
+            "user_id": user.id,
+            "type": "final",
+            "status": "verified",
+        })
+    db.execute(insert(Application), applications)
+
+    rows = []
+    for i in range(athletes):
+        gender = "male" if i % 2 else "female"
+        categories = CATEGORIES[gender]
+        rows.append({
+            "application_id": applications[i % len(applications)]["id"],
+            "gender": gender,
+            "last_name": f"L{i}",
+            "first_name": f"F{i}",
+            "birth_date": date(2000, 1, 1),
+            "weight_category": categories[i % len(categories)],
+            "entry_total": 150 + i % 250,
+        })
+    db.execute(insert(ApplicationAthlete), rows)
+    db.commit()
+    return competition.id
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--athletes", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    competition_id = seed(db, args.athletes)
+
+    timings = {"load": [], "compute": [], "insert": [], "total": []}
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        athletes = draw_engine.load_athletes(db, competition_id)
+        loaded = time.perf_counter()
+        rows = draw_engine.compute_draw(competition_id, athletes, draw_engine.new_seed())
+        computed = time.perf_counter()
+        draw_engine.write_draw(db, rows)
+        db.commit()
+        finished = time.perf_counter()
+
+        timings["load"].append(loaded - started)
+        timings["compute"].append(computed - loaded)
+        timings["insert"].append(finished - computed)
+        timings["total"].append(finished - started)
+
+        db.execute(delete(CompetitionDrawEntry).where(CompetitionDrawEntry.competition_id == competition_id))
+        db.commit()
+
+    # воспроизводимость: тот же seed — тот же жребий
+    athletes = draw_engine.load_athletes(db, competition_id)
+    strip = lambda rows: [(r["athlete_id"], r["group_letter"], r["lot_number"]) for r in rows]
+    assert strip(draw_engine.compute_draw(competition_id, athletes, 42)) == \
+        strip(draw_engine.compute_draw(competition_id, athletes[::-1], 42))
+
+    print(f"{engine.url.get_backend_name()}: {len(athletes)} athletes, {len(rows)} draw entries")
+    for name, values in timings.items():
+        print(f"  {name:<8} best {min(values) * 1000:8.1f} ms   median {sorted(values)[len(values) // 2] * 1000:8.1f} ms")
+
+    db.execute(delete(ApplicationAthlete).where(
+        ApplicationAthlete.application_id.in_(
+            select(Application.id).where(Application.competition_id == competition_id)
+        )
+    ))
+    db.execute(delete(Application).where(Application.competition_id == competition_id))
+    db.execute(delete(Competition).where(Competition.id == competition_id))
+    db.commit()
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
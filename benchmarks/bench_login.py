@@ -0,0 +1,135 @@
+"""
+Пропускная способность входа: открытие аккредитации, сотни делегатов разом.
+
+    python benchmarks/bench_login.py [--users 200] [--concurrency 100] [--old-rounds 10] [--wait 120]
+
+Логины идут через ASGI (httpx.ASGITransport) параллельно; в это же время
+отдельная задача опрашивает лёгкий маршрут (/monitoring/db-pool) — его
+задержка показывает, не забивает ли bcrypt остальные запросы.
+Часть пользователей создаётся с хэшами стоимости --old-rounds: после входа
+их хэши должны быть пересчитаны под BCRYPT_ROUNDS.
+
+Размер пула — PASSWORD_HASH_WORKERS (по умолчанию min(4, ядер)), стоимость —
+BCRYPT_ROUNDS. --wait — сколько вход ждёт хэшер до 503 (в приложении
+PASSWORD_HASH_WAIT_SECONDS); при малом значении часть входов получит 503.
+По умолчанию — временная SQLite; для Postgres задайте DATABASE_URL.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+TMP_DB = os.path.join(tempfile.mkdtemp(), "bench_login.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{TMP_DB}")
+
+import httpx  # noqa: E402
+from sqlalchemy import delete, insert, select  # noqa: E402
+
+from app.config import settings  # noqa: E402
+from app.core.passwords import hasher, pwd_context  # noqa: E402
+from app.database import Base, SessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import User  # noqa: E402
+
+PASSWORD = "accreditation-2026"
+
+
+def percentile(values: list[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(int(len(values) * p), len(values) - 1)] if values else 0.0
+
+
+def seed(users: int, old_rounds: int) -> tuple[list[str], list[str]]:
+    # хэш один на всех: посев не должен занимать больше самого бенчмарка
+    current = pwd_context.hash(PASSWORD)
+    old = pwd_context.hash(PASSWORD, rounds=old_rounds)
+    emails = [f"delegate{i}-{uuid.uuid4().hex[:8]}@example.com" for i in range(users)]
+    outdated = emails[::4]
+
+    with SessionLocal() as db:
+        db.execute(insert(User), [
+            {
+                "id": uuid.uuid4(),
+                "email": email,
+                "hashed_password": old if email in outdated else current,
+                "full_name": email,
+                "global_role": "athlete",
+            }
+            for email in emails
+        ])
+        db.commit()
+    return emails, outdated
+
+
+async def probe(client: httpx.AsyncClient, latencies: list[float], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await client.get("/monitoring/db-pool")
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(0.01)
+
+
+async def run(args) -> None:
+    Base.metadata.create_all(bind=engine)
+    emails, outdated = seed(args.users, args.old_rounds)
+    hasher.wait_seconds = args.wait
+
+    slots = asyncio.Semaphore(args.concurrency)
+    latencies: list[float] = []
+    statuses: dict[int, int] = {}
+    probe_latencies: list[float] = []
+
+    async def login(client, email):
+        async with slots:
+            started = time.perf_counter()
+            response = await client.post("/auth/login", json={"email_or_username": email, "password": PASSWORD})
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        stop = asyncio.Event()
+        prober = asyncio.create_task(probe(client, probe_latencies, stop))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(login(client, email) for email in emails))
+        elapsed = time.perf_counter() - started
+
+        stop.set()
+        await prober
+
+    with SessionLocal() as db:
+        hashes = db.scalars(select(User.hashed_password).where(User.email.in_(outdated))).all()
+        rehashed = sum(not pwd_context.needs_update(h) for h in hashes)
+        db.execute(delete(User).where(User.email.in_(emails)))
+        db.commit()
+    hasher.shutdown()
+
+    rate = statuses.get(200, 0) / elapsed
+    print(
+        f"{engine.url.get_backend_name()}: {len(emails)} logins, concurrency {args.concurrency}, "
+        f"bcrypt rounds {settings.BCRYPT_ROUNDS}, {hasher.workers} hash workers ({os.cpu_count()} cores)"
+    )
+    print(f"  statuses: {statuses}")
+    print(f"  throughput: {rate:.1f} logins/s, {rate / hasher.workers:.1f} logins/s per worker")
+    print(f"  login     p50 {percentile(latencies, 0.5) * 1000:8.1f} ms   p99 {percentile(latencies, 0.99) * 1000:8.1f} ms")
+    print(f"  probe     p50 {percentile(probe_latencies, 0.5) * 1000:8.1f} ms   p99 {percentile(probe_latencies, 0.99) * 1000:8.1f} ms   ({len(probe_latencies)} requests)")
+    print(f"  rehashed on login: {rehashed}/{len(outdated)} (rounds {args.old_rounds} -> {settings.BCRYPT_ROUNDS})")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--old-rounds", type=int, default=10)
+    parser.add_argument("--wait", type=float, default=120)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
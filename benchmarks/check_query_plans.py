@@ -0,0 +1,115 @@
+"""
+Проверка планов горячих запросов: каждый должен идти по индексу.
+
+    python benchmarks/check_query_plans.py
+
+По умолчанию — временная SQLite (EXPLAIN QUERY PLAN); для Postgres задайте
+DATABASE_URL (EXPLAIN, seqscan отключается — на пустых таблицах планировщик
+иначе честно выбирает полный просмотр). Таблицы создаются по моделям.
+Код выхода 1 — какой-то запрос перестал попадать в индекс.
+"""
+import os
+import sys
+import tempfile
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+TMP_DB = os.path.join(tempfile.mkdtemp(), "check_query_plans.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{TMP_DB}")
+
+from sqlalchemy import case, func, select  # noqa: E402
+
+from app.database import Base, engine  # noqa: E402
+from app.models import (  # noqa: E402
+    Application, ApplicationAthlete, ApplicationEvent, ApplicationStatus, Attempt, CompetitionRole, Vote,
+)
+from app.models.draw import CompetitionDrawEntry  # noqa: E402
+
+COMPETITION_ID = uuid.uuid4()
+ATTEMPT_ID = uuid.uuid4()
+APPLICATION_ID = uuid.uuid4()
+
+# имя запроса -> (запрос, индексы, любой из которых нас устраивает)
+QUERIES = {
+    "attempts: active": (
+        select(Attempt.id).where(Attempt.competition_id == COMPETITION_ID, Attempt.status == "active"),
+        # на пустой таблице SQLite выбирает составной индекс — тоже годится
+        {"ix_attempts_active", "ix_attempts_competition_status_created"},
+    ),
+    "attempts: declared by time": (
+        select(Attempt.id)
+        .where(Attempt.competition_id == COMPETITION_ID, Attempt.status == "declared")
+        .order_by(Attempt.created_at),
+        {"ix_attempts_competition_status_created"},
+    ),
+    "votes: judge count": (
+        select(func.count(Vote.id), func.sum(case((Vote.vote.is_(True), 1), else_=0)))
+        .where(Vote.attempt_id == ATTEMPT_ID, Vote.role == "judge"),
+        {"ix_votes_attempt_role_vote", "uq_vote_per_user_attempt", "sqlite_autoindex_votes_1"},
+    ),
+    "roles: competition": (
+        select(CompetitionRole.user_id, CompetitionRole.role).where(CompetitionRole.competition_id == COMPETITION_ID),
+        {"ix_competition_roles_competition_user_role"},
+    ),
+    "applications: verified": (
+        select(Application.id).where(
+            Application.competition_id == COMPETITION_ID,
+            Application.type == "final",
+            Application.status == ApplicationStatus.verified.value,
+        ),
+        {"ix_applications_competition_type_status_federation"},
+    ),
+    "application athletes": (
+        select(ApplicationAthlete.id).where(ApplicationAthlete.application_id == APPLICATION_ID),
+        {"ix_application_athletes_application_id"},
+    ),
+    "application history": (
+        select(ApplicationEvent.action)
+        .where(ApplicationEvent.application_id == APPLICATION_ID)
+        .order_by(ApplicationEvent.timestamp),
+        {"ix_application_events_application_timestamp"},
+    ),
+    "draw sheet": (
+        select(CompetitionDrawEntry.athlete_id)
+        .where(CompetitionDrawEntry.competition_id == COMPETITION_ID)
+        .order_by(
+            CompetitionDrawEntry.gender,
+            CompetitionDrawEntry.weight_category,
+            CompetitionDrawEntry.group_letter,
+            CompetitionDrawEntry.lot_number,
+        ),
+        {"ix_draw_entries_competition_group_lot"},
+    ),
+}
+
+
+def explain(conn, query) -> str:
+    sql = str(query.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+    if engine.dialect.name == "sqlite":
+        return "\n".join(row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}"))
+    return "\n".join(row[0] for row in conn.exec_driver_sql(f"EXPLAIN {sql}"))
+
+
+def main():
+    Base.metadata.create_all(bind=engine)
+
+    failed = 0
+    with engine.connect() as conn:
+        if engine.dialect.name == "postgresql":
+            conn.exec_driver_sql("SET enable_seqscan = off")
+
+        for name, (query, indexes) in QUERIES.items():
+            plan = explain(conn, query)
+            ok = any(index in plan for index in indexes)
+            failed += not ok
+            print(f"{'ok  ' if ok else 'FAIL'} {name}")
+            if not ok:
+                print("     " + plan.replace("\n", "\n     "))
+
+    print(f"{engine.url.get_backend_name()}: {len(QUERIES) - failed}/{len(QUERIES)} queries use an index")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,437 @@
+"""
+Проверки на исправленные ошибки — без сервера и внешних сервисов.
+
+    python benchmarks/check_regressions.py
+
+Каждая проверка — функция check_*; код выхода 1, если какая-то упала.
+"""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import traceback
+import uuid
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+TMP_DB = os.path.join(tempfile.mkdtemp(), "check_regressions.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{TMP_DB}")
+# счётчик запросов и детектор N+1 в приложении по умолчанию выключены
+os.environ.setdefault("QUERY_STATS_ENABLED", "true")
+
+from fastapi import BackgroundTasks  # noqa: E402
+
+from app.core.broadcast import ConnectionManager, manager  # noqa: E402
+from app.core.bus import InProcessBus, PayloadTooLarge, PostgresNotifyBus  # noqa: E402
+from app.core.roles import RoleIndex  # noqa: E402
+from app.domain.live_state import LIVE_STATE_CHANNEL, live_states  # noqa: E402
+
+
+class FakeWebSocket:
+    def __init__(self, on_accept=None):
+        self.on_accept = on_accept
+        self.sent: list[dict] = []
+
+    async def accept(self):
+        if self.on_accept:
+            await self.on_accept()
+
+    async def send_text(self, payload: str):
+        self.sent.append(json.loads(payload))
+
+    async def close(self):
+        pass
+
+
+def check_resume_keeps_message_delivered_during_accept():
+    """Воркер только что перезапущен: backlog из журнала, seq 61 приходит во время accept."""
+
+    async def scenario():
+        manager = ConnectionManager(bus=InProcessBus())
+        cid = "competition"
+        backlog = [{"type": "vote_submitted", "seq": seq} for seq in range(51, 61)]
+
+        async def deliver_during_accept():
+            await manager._deliver(cid, {"type": "vote_submitted", "seq": 61})
+
+        ws = FakeWebSocket(deliver_during_accept)
+        await manager.connect(cid, ws, backlog, last_seq=50)
+        await asyncio.sleep(0.05)
+        manager.disconnect(cid, ws)
+        return [m["seq"] for m in ws.sent]
+
+    seqs = asyncio.run(scenario())
+    assert seqs == list(range(51, 62)), seqs
+
+
+def declared_events(count: int) -> list[dict]:
+    return [
+        {
+            "type": "attempt_declared",
+            "seq": 1000 + i,
+            "attempt": {
+                "id": str(uuid.uuid4()),
+                "draw_entry_id": str(uuid.uuid4()),
+                "lift_type": "snatch",
+                "weight": 100,
+                "status": "declared",
+                "created_at": datetime.utcnow().isoformat(),
+            },
+        }
+        for i in range(count)
+    ]
+
+
+def check_notify_bus_rejects_oversized_payload():
+    bus = PostgresNotifyBus("postgresql://unused", "wlt_broadcast")
+    message = {"competition_id": "c", "events": declared_events(100)}
+    try:
+        asyncio.run(bus.publish(LIVE_STATE_CHANNEL, message))
+    except PayloadTooLarge:
+        return
+    raise AssertionError("oversized NOTIFY payload was not rejected")
+
+
+def check_large_batch_split_to_fit_notify():
+    """Пакет заявок (/attempts/batch) уходит в шину кусками не длиннее 8000 байт."""
+    events = declared_events(300)
+    bus = manager.bus
+    background_tasks = BackgroundTasks()
+    try:
+        manager.bus = PostgresNotifyBus("postgresql://unused", "wlt_broadcast")
+        live_states.publish_all(str(uuid.uuid4()), events, background_tasks)
+        messages = [task.args[1] for task in background_tasks.tasks if task.args[0] == LIVE_STATE_CHANNEL]
+        for message in messages:
+            manager.bus._encode(LIVE_STATE_CHANNEL, message)
+    finally:
+        manager.bus = bus
+
+    assert len(messages) > 1, len(messages)
+    assert [e for m in messages for e in m["events"]] == events
+
+
+def check_role_change_during_load_is_not_cached_stale():
+    """Судью сняли, пока загрузка ролей читала БД: старое чтение не должно остаться в индексе."""
+    competition_id, judge = str(uuid.uuid4()), str(uuid.uuid4())
+    index = RoleIndex()
+
+    class FakeDb:
+        def __init__(self):
+            self.reads = 0
+
+        async def execute(self, statement):
+            self.reads += 1
+            if self.reads == 1:
+                # старое чтение, а commit удаления роли и его apply — пока запрос идёт
+                index.apply({"competition_id": competition_id, "user_id": judge, "role": "judge", "action": "removed"})
+                return [(uuid.UUID(judge), "judge")]
+            return []
+
+    db = FakeDb()
+    assert asyncio.run(index.count(db, competition_id, "judge")) == 0
+    assert index.competitions[competition_id] == {}
+    assert db.reads == 2, db.reads
+
+
+def check_role_index_expires():
+    competition_id = str(uuid.uuid4())
+    index = RoleIndex(ttl=0)
+
+    class FakeDb:
+        reads = 0
+
+        async def execute(self, statement):
+            FakeDb.reads += 1
+            return []
+
+    asyncio.run(index.count(FakeDb(), competition_id, "judge"))
+    asyncio.run(index.count(FakeDb(), competition_id, "judge"))
+    assert FakeDb.reads == 2, FakeDb.reads
+
+
+def fake_hydrate(registry, events: list[dict], calls: list | None = None):
+    """Загрузка состояния: один участник с заявленной попыткой; events приходят по шине во время чтения."""
+    from app.domain.live_state import AttemptState, EntryState
+
+    async def hydrate(state, db, use_snapshot=True):
+        if calls is not None:
+            calls.append(use_snapshot)
+        state.entries["entry"] = EntryState(
+            id="entry", athlete_id="athlete", athlete_name="A", gender="male",
+            weight_category="73", group="A", lot=1, entry_total=None,
+        )
+        for event in events:
+            registry.apply(state.competition_id, event)
+        state._add_attempt(AttemptState(
+            id="attempt", draw_entry_id="entry", lift_type="snatch", weight=100,
+            status="declared", result=None, created_at=datetime.utcnow(),
+        ))
+
+    return hydrate
+
+
+def check_event_during_hydration_is_not_lost():
+    from app.domain.live_state import CompetitionState, LiveStateRegistry
+
+    registry = LiveStateRegistry()
+    original = CompetitionState.hydrate
+    CompetitionState.hydrate = fake_hydrate(registry, [{"type": "attempt_started", "attempt_id": "attempt", "seq": 2}])
+    try:
+        state = asyncio.run(registry.get(None, "competition"))
+    finally:
+        CompetitionState.hydrate = original
+
+    assert state.attempts["attempt"].status == "active", state.attempts["attempt"].status
+    assert registry.states["competition"] is state
+
+
+def check_live_state_expires():
+    from app.domain.live_state import CompetitionState, LiveStateRegistry
+
+    registry = LiveStateRegistry(ttl=0)
+    calls = []
+    original = CompetitionState.hydrate
+    CompetitionState.hydrate = fake_hydrate(registry, [], calls)
+    try:
+        asyncio.run(registry.get(None, "competition"))
+        asyncio.run(registry.get(None, "competition"))
+    finally:
+        CompetitionState.hydrate = original
+
+    # перечитывание по TTL — из таблиц, не со снимка
+    assert calls == [True, False], calls
+
+
+def check_tie_goes_to_who_lifted_first():
+    """Равная сумма, подходы заявлены одним пакетом: выше тот, кто закрыл попытки раньше, а не заявил."""
+    from app.domain.live_state import CompetitionState, EntryState
+
+    state = CompetitionState("competition")
+    for lot, entry_id in enumerate(("declared_first", "lifted_first"), start=1):
+        state.entries[entry_id] = EntryState(
+            id=entry_id, athlete_id=entry_id, athlete_name=entry_id, gender="male",
+            weight_category="73", group="A", lot=lot, entry_total=None,
+        )
+    declared_at = datetime(2026, 1, 1)
+    for entry_id in ("declared_first", "lifted_first"):
+        for lift_type in ("snatch", "clean_and_jerk"):
+            state.apply({"type": "attempt_declared", "attempt": {
+                "id": f"{entry_id}-{lift_type}", "draw_entry_id": entry_id, "lift_type": lift_type,
+                "weight": 100, "status": "declared", "created_at": declared_at.isoformat(),
+            }})
+            declared_at = declared_at.replace(second=declared_at.second + 1)
+
+    seq = 10
+    for lift_type in ("snatch", "clean_and_jerk"):
+        for entry_id in ("lifted_first", "declared_first"):
+            seq += 1
+            state.apply({"type": "attempt_closed", "attempt_id": f"{entry_id}-{lift_type}", "result": "passed", "seq": seq})
+
+    ranks = {a["draw_entry_id"]: a["rank"] for a in state.standings()[0]["athletes"]}
+    assert ranks == {"lifted_first": 1, "declared_first": 2}, ranks
+    # тот же порядок после перезагрузки из снимка
+    reloaded = CompetitionState("competition")
+    reloaded.load_snapshot(state.to_snapshot())
+    assert reloaded.standings() == state.standings()
+
+
+def check_metrics_route_labels_include_router_prefix():
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    competition_id = uuid.uuid4()
+    with TestClient(app) as client:
+        client.get("/competitions/")
+        client.post("/auth/login", json={"email_or_username": "nobody", "password": "x"})
+        client.get(f"/competitions/{competition_id}/results")
+        client.get("/no/such/path")
+        text = client.get("/metrics").text
+
+    routes = {line.split('route="')[1].split('"')[0] for line in text.splitlines() if 'route="' in line}
+    for expected in ("/competitions/", "/auth/login", "/competitions/{competition_id}/results", "unmatched"):
+        assert expected in routes, routes
+    assert "/" not in routes and "/login" not in routes, routes
+    assert not any(str(competition_id) in route for route in routes), routes
+
+
+def check_not_modified_requires_auth():
+    from fastapi.testclient import TestClient
+
+    from app.core.versioning import versions
+    from app.main import app
+
+    competition_id = uuid.uuid4()
+    headers = {"If-None-Match": versions.etag(str(competition_id))}
+    with TestClient(app) as client:
+        response = client.get(f"/competitions/{competition_id}/applications", headers=headers)
+    assert response.status_code in (401, 403), response.status_code
+
+
+def competition_with_secretary():
+    """Соревнование во временной БД и заголовок авторизации его секретаря."""
+    from datetime import date
+
+    from app import models
+    from app.core.security import create_access_token
+    from app.database import Base, SessionLocal, engine
+
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        secretary = models.User(email=f"{uuid.uuid4()}@example.com", hashed_password="x", full_name="s", global_role="athlete")
+        competition = models.Competition(name="C", date=date.today(), location="L")
+        db.add_all([secretary, competition])
+        db.flush()
+        db.add(models.CompetitionRole(competition_id=competition.id, user_id=secretary.id, role="secretary"))
+        db.commit()
+        return competition.id, {"Authorization": "Bearer " + create_access_token({"sub": str(secretary.id)})}
+
+
+def check_cache_miss_request_holds_one_connection():
+    """Промах кэша токенов и индекса ролей в синхронном маршруте: одно соединение пула за раз."""
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+
+    from app.database import engine
+    from app.main import app
+
+    competition_id, headers = competition_with_secretary()
+
+    checked_out, peak = 0, 0
+
+    def on_checkout(*args):
+        nonlocal checked_out, peak
+        checked_out += 1
+        peak = max(peak, checked_out)
+
+    def on_checkin(*args):
+        nonlocal checked_out
+        checked_out -= 1
+
+    event.listen(engine, "checkout", on_checkout)
+    event.listen(engine, "checkin", on_checkin)
+    try:
+        with TestClient(app) as client:
+            response = client.get(f"/competitions/{competition_id}/applications", headers=headers)
+    finally:
+        event.remove(engine, "checkout", on_checkout)
+        event.remove(engine, "checkin", on_checkin)
+
+    assert response.status_code == 200, response.status_code
+    assert peak == 1, peak
+
+
+def check_start_does_not_reopen_attempt_closed_meanwhile():
+    """Решающий голос закрыл попытку, пока start проверял права: start отвечает 409, попытка остаётся closed."""
+    from fastapi.testclient import TestClient
+    from sqlalchemy import update
+
+    from app import models
+    from app.core.deps import CompetitionAccess
+    from app.database import SessionLocal
+    from app.main import app
+
+    competition_id, headers = competition_with_secretary()
+    with SessionLocal() as db:
+        attempt = models.Attempt(competition_id=competition_id, draw_entry_id=uuid.uuid4(), lift_type="snatch", weight=100)
+        db.add(attempt)
+        db.commit()
+        attempt_id = attempt.id
+
+    require = CompetitionAccess.require
+
+    async def require_then_close(self, *args):
+        user = await require(self, *args)
+        with SessionLocal() as db:
+            db.execute(update(models.Attempt).where(models.Attempt.id == attempt_id).values(status="closed", result="passed"))
+            db.commit()
+        return user
+
+    CompetitionAccess.require = require_then_close
+    try:
+        with TestClient(app) as client:
+            response = client.post(f"/judging/attempts/{attempt_id}/start", headers=headers)
+    finally:
+        CompetitionAccess.require = require
+
+    with SessionLocal() as db:
+        status = db.get(models.Attempt, attempt_id).status
+    assert response.status_code == 409, response.status_code
+    assert status == "closed", status
+
+
+def check_event_log_append_is_one_insert():
+    from app.core import query_stats
+    from app.database import Base, async_session, engine
+    from app.domain import event_log
+    from app.main import app  # noqa: F401 — подписывает движок на учёт запросов
+
+    Base.metadata.create_all(bind=engine)
+    competition_id = uuid.uuid4()
+    events = [{"type": "attempt_weight_changed", "attempt_id": str(i), "weight": 100 + i} for i in range(20)]
+
+    async def scenario():
+        async with async_session() as db:
+            with query_stats.assert_max_queries(1):
+                await event_log.append(db, competition_id, events)
+            await db.commit()
+            return await event_log.events_after(db, competition_id, 0)
+
+    stored = asyncio.run(scenario())
+    assert [e["seq"] for e in events] == [e["seq"] for e in stored], (events, stored)
+    assert [e["attempt_id"] for e in stored] == [str(i) for i in range(20)]
+
+
+def check_query_stats_require_super_admin():
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    competition_id, headers = competition_with_secretary()
+    with TestClient(app) as client:
+        anonymous = client.get("/monitoring/queries")
+        secretary = client.get("/monitoring/queries", headers=headers)
+    assert anonymous.status_code in (401, 403), anonymous.status_code
+    assert secretary.status_code == 403, secretary.status_code
+
+
+def check_failed_statement_leaves_nothing_on_connection():
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.exc import OperationalError
+
+    from app.core import query_stats
+
+    engine = create_engine("sqlite://")
+    query_stats.install(engine)
+    with query_stats.assert_max_queries(10) as stats:
+        with engine.connect() as conn:
+            for _ in range(3):
+                try:
+                    conn.execute(text("SELECT * FROM no_such_table"))
+                except OperationalError:
+                    pass
+            conn.execute(text("SELECT 1"))
+            info = dict(conn.info)
+
+    assert stats.count == 1, stats.count
+    assert not any(isinstance(value, list) for value in info.values()), info
+
+
+def main():
+    checks = [(name, fn) for name, fn in globals().items() if name.startswith("check_")]
+    failed = 0
+    for name, fn in checks:
+        try:
+            fn()
+            print(f"ok   {name}")
+        except Exception:
+            failed += 1
+            print(f"FAIL {name}")
+            traceback.print_exc()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+"""
+Симуляция дня соревнований в одном процессе, без сервера и сети.
+
+    python benchmarks/competition_day.py [--federations 50] [--athletes-per-federation 6]
+        [--attempts 100] [--scoreboards 500] [--coaches 50] [--poll-interval 0.2]
+
+Приложение вызывается напрямую через ASGI (httpx.ASGITransport — нужен httpx,
+как и для TestClient). Сценарий: посев федераций, заявок и атлетов через ORM,
+жеребьёвка (POST /draw), заявка подходов пачкой (POST /attempts/batch), затем
+сессия — секретарь вызывает подходы по очереди, три судьи голосуют
+одновременно, табло слушают рассылку, тренеры опрашивают current_attempt
+и results (с If-None-Match, как браузер).
+
+Табло — поддельные WebSocket-подключения, зарегистрированные прямо
+в ConnectionManager: рассылка идёт по настоящему пути (шина, очереди,
+задачи отправки), без накладных расходов транспорта.
+
+По умолчанию — временная SQLite; для Postgres задайте DATABASE_URL
+(таблицы будут созданы по моделям). ASYNC_DB=1 — асинхронный движок.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+TMP_DB = os.path.join(tempfile.mkdtemp(), "competition_day.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{TMP_DB}")
+# счётчик запросов и детектор N+1 в приложении по умолчанию выключены
+os.environ.setdefault("QUERY_STATS_ENABLED", "true")
+
+import httpx  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+from app.core.broadcast import manager  # noqa: E402
+from app.core.security import create_access_token  # noqa: E402
+from app.database import Base, SessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import (  # noqa: E402
+    Application, ApplicationAthlete, Competition, CompetitionRole, Federation, User,
+)
+
+CATEGORIES = {
+    "male": ["60", "65", "71", "79", "88", "94", "110", "+110"],
+    "female": ["48", "53", "58", "63", "69", "77", "86", "+86"],
+}
+
+
+def percentile(values: list[float], p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * p), len(values) - 1)]
+
+
+class Timings:
+    def __init__(self):
+        self.samples: dict[str, list[float]] = defaultdict(list)
+        self.statuses: dict[str, dict[int, int]] = defaultdict(lambda: defaultdict(int))
+
+    def add(self, name: str, seconds: float, status: int | None = None) -> None:
+        self.samples[name].append(seconds)
+        if status is not None:
+            self.statuses[name][status] += 1
+
+    def report(self, elapsed: float) -> None:
+        print(f"  {'':<22} {'count':>7} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}  statuses")
+        for name, values in self.samples.items():
+            statuses = " ".join(f"{code}:{n}" for code, n in sorted(self.statuses[name].items()))
+            print(
+                f"  {name:<22} {len(values):>7} {percentile(values, 0.5) * 1000:>9.2f} "
+                f"{percentile(values, 0.99) * 1000:>9.2f} {max(values) * 1000:>9.2f}  {statuses}"
+            )
+        requests = sum(len(v) for name, v in self.samples.items() if not name.startswith("broadcast"))
+        print(f"  throughput: {requests / elapsed:.0f} requests/s over {elapsed:.1f} s")
+
+
+class Scoreboard:
+    """Поддельный WebSocket: запоминает, когда пришло закрытие каждого подхода."""
+
+    def __init__(self, closed: dict[str, list[float]]):
+        self.closed = closed
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, payload: str):
+        self._received(payload)
+
+    async def send_bytes(self, payload: bytes):
+        self._received(payload.decode(errors="ignore"))
+
+    def _received(self, payload: str):
+        # полноценный разбор JSON здесь не нужен — ищем attempt_closed
+        if '"attempt_closed"' not in payload:
+            return
+        now = time.perf_counter()
+        marker = '"attempt_id":"'
+        start = payload.find(marker, payload.find('"attempt_closed"') - 200)
+        if start != -1:
+            start += len(marker)
+            self.closed[payload[start:start + 36]].append(now)
+
+    async def close(self):
+        pass
+
+
+def seed(federations: int, athletes_per_federation: int, coaches: int) -> dict:
+    db = SessionLocal()
+    admin = User(email=f"admin-{uuid.uuid4().hex}@example.com", hashed_password="x", full_name="admin", global_role="super_admin")
+    secretary = User(email=f"sec-{uuid.uuid4().hex}@example.com", hashed_password="x", full_name="secretary")
+    judges = [User(email=f"judge{i}-{uuid.uuid4().hex}@example.com", hashed_password="x", full_name=f"judge {i}") for i in range(3)]
+    coach_users = [User(email=f"coach{i}-{uuid.uuid4().hex}@example.com", hashed_password="x", full_name=f"coach {i}") for i in range(coaches)]
+    competition = Competition(name="competition day", date=date.today(), location="bench")
+    db.add_all([admin, secretary, competition, *judges, *coach_users])
+    db.flush()
+
+    db.add(CompetitionRole(competition_id=competition.id, user_id=secretary.id, role="secretary"))
+    db.add_all(CompetitionRole(competition_id=competition.id, user_id=judge.id, role="judge") for judge in judges)
+
+    applications = []
+    for i in range(federations):
+        federation = Federation(name=f"bench-{uuid.uuid4().hex}")
+        db.add(federation)
+        db.flush()
+        applications.append({
+            "id": uuid.uuid4(),
+            "competition_id": competition.id,
+            "federation_id": federation.id,
+            "user_id": admin.id,
+            "type": "final",
+            "status": "verified",
+        })
+    db.execute(insert(Application), applications)
+
+    rows = []
+    for i in range(federations * athletes_per_federation):
+        gender = "male" if i % 2 else "female"
+        categories = CATEGORIES[gender]
+        rows.append({
+            "application_id": applications[i % len(applications)]["id"],
+            "gender": gender,
+            "last_name": f"L{i}",
+            "first_name": f"F{i}",
+            "birth_date": date(2000, 1, 1),
+            "weight_category": categories[i % len(categories)],
+            "entry_total": 150 + i % 250,
+        })
+    db.execute(insert(ApplicationAthlete), rows)
+    db.commit()
+
+    token = lambda user: {"Authorization": "Bearer " + create_access_token({"sub": str(user.id)})}
+    result = {
+        "competition_id": str(competition.id),
+        "admin": token(admin),
+        "secretary": token(secretary),
+        "judges": [token(judge) for judge in judges],
+        "coaches": [token(coach) for coach in coach_users],
+    }
+    db.close()
+    return result
+
+
+async def timed(client: httpx.AsyncClient, timings: Timings, name: str, method: str, url: str, **kwargs):
+    started = time.perf_counter()
+    response = await client.request(method, url, **kwargs)
+    timings.add(name, time.perf_counter() - started, response.status_code)
+    return response
+
+
+async def coach(client, timings, competition_id, headers, interval, stop: asyncio.Event):
+    etags: dict[str, str] = {}
+    urls = {
+        "GET current_attempt": f"/judging/competitions/{competition_id}/current_attempt",
+        "GET results": f"/competitions/{competition_id}/results",
+    }
+    while not stop.is_set():
+        for name, url in urls.items():
+            request_headers = dict(headers)
+            if url in etags:
+                request_headers["If-None-Match"] = etags[url]
+            response = await timed(client, timings, name, "GET", url, headers=request_headers)
+            if "etag" in response.headers:
+                etags[url] = response.headers["etag"]
+        try:
+            await asyncio.wait_for(stop.wait(), interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def run(args) -> None:
+    Base.metadata.create_all(bind=engine)
+    await manager.start()
+
+    setup = seed(args.federations, args.athletes_per_federation, args.coaches)
+    cid = setup["competition_id"]
+    timings = Timings()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        started = time.perf_counter()
+        response = await timed(client, timings, "POST draw", "POST", f"/draw/{cid}/draw", headers=setup["admin"])
+        response.raise_for_status()
+        print(f"draw: {response.json()['entries']} entries in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+        entries = (await client.get(f"/attempts/draw_entries/{cid}", headers=setup["secretary"])).json()
+        declarations = [
+            {"draw_entry_id": entry["id"], "weight": 60 + i % 120, "lift_type": lift_type}
+            for i, entry in enumerate(entries)
+            for lift_type in ("snatch", "clean_and_jerk")
+        ][: args.attempts]
+        response = await timed(
+            client, timings, "POST attempts/batch", "POST", "/attempts/batch",
+            json={"competition_id": cid, "declarations": declarations}, headers=setup["secretary"],
+        )
+        response.raise_for_status()
+
+        closed: dict[str, list[float]] = defaultdict(list)
+        scoreboards = [Scoreboard(closed) for _ in range(args.scoreboards)]
+        for scoreboard in scoreboards:
+            await manager.connect(cid, scoreboard)
+
+        stop = asyncio.Event()
+        coaches = [
+            asyncio.create_task(coach(client, timings, cid, headers, args.poll_interval, stop))
+            for headers in setup["coaches"]
+        ]
+
+        session_started = time.perf_counter()
+        vote_sent: dict[str, float] = {}
+        for _ in range(len(declarations)):
+            order = (await timed(
+                client, timings, "GET lift_order", "GET",
+                f"/judging/competitions/{cid}/lift_order?limit=1", headers=setup["secretary"],
+            )).json()
+            if not order["next"]:
+                break
+            attempt_id = order["next"]["attempt_id"]
+
+            await timed(client, timings, "POST start", "POST", f"/judging/attempts/{attempt_id}/start", headers=setup["secretary"])
+            vote_sent[attempt_id] = time.perf_counter()
+            await asyncio.gather(*(
+                timed(
+                    client, timings, "POST vote", "POST", f"/judging/attempts/{attempt_id}/vote",
+                    json={"vote": i != 2 or bool(len(vote_sent) % 2)}, headers=headers,
+                )
+                for i, headers in enumerate(setup["judges"])
+            ))
+
+        # дать очередям табло опустеть
+        deadline = time.perf_counter() + 10
+        while time.perf_counter() < deadline and any(len(closed[a]) < args.scoreboards for a in vote_sent):
+            await asyncio.sleep(0.01)
+        elapsed = time.perf_counter() - session_started
+
+        stop.set()
+        await asyncio.gather(*coaches)
+
+    for attempt_id, sent in vote_sent.items():
+        received = closed.get(attempt_id)
+        if received:
+            timings.add("broadcast first board", min(received) - sent)
+            timings.add("broadcast last board", max(received) - sent)
+
+    delivered = sum(len(closed.get(a, ())) for a in vote_sent)
+    print(
+        f"{engine.url.get_backend_name()}: {len(entries)} athletes, {len(vote_sent)} attempts, "
+        f"{args.scoreboards} scoreboards, {args.coaches} coaches"
+    )
+    print(f"  attempt_closed delivered: {delivered}/{len(vote_sent) * args.scoreboards}")
+    print(f"  session: {len(vote_sent) / elapsed * 60:.0f} attempts/min")
+    timings.report(elapsed)
+
+    for scoreboard in scoreboards:
+        manager.disconnect(cid, scoreboard)
+    await manager.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--federations", type=int, default=50)
+    parser.add_argument("--athletes-per-federation", type=int, default=6)
+    parser.add_argument("--attempts", type=int, default=100)
+    parser.add_argument("--scoreboards", type=int, default=500)
+    parser.add_argument("--coaches", type=int, default=50)
+    parser.add_argument("--poll-interval", type=float, default=0.2)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()